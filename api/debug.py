@@ -0,0 +1,62 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from core.memory import memory_report, tracemalloc_session
+from core.profiling import ProfileIn, profile_request, request_profiler
+from core.security import require_admin_token
+
+router = APIRouter(prefix="/debug", tags=["debug"], dependencies=[Depends(require_admin_token)])
+
+
+@router.get("/profile")
+async def profile_status():
+    return request_profiler.status()
+
+
+@router.post("/profile")
+async def arm_profile(payload: ProfileIn):
+    try:
+        request_profiler.arm(profile_request(payload))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return request_profiler.status()
+
+
+@router.delete("/profile")
+async def disarm_profile():
+    request_profiler.disarm()
+    return request_profiler.status()
+
+
+@router.get("/memory")
+async def memory(top_types: int = Query(default=0, ge=0, le=200)):
+    # Runs on the loop on purpose: probes walk dicts that handlers mutate.
+    return memory_report(top_types)
+
+
+@router.post("/memory/snapshot")
+async def memory_snapshot(
+    frames: int = Query(default=1, ge=1, le=25),
+    group_by: str = Query(default="filename", pattern="^(filename|lineno|traceback)$"),
+    limit: int = Query(default=20, ge=1, le=200),
+):
+    # Starts tracemalloc on first use; tracing slows allocations until DELETE.
+    return await asyncio.to_thread(tracemalloc_session.snapshot, frames, group_by, limit)
+
+
+@router.get("/memory/diff")
+async def memory_diff(
+    group_by: str = Query(default="filename", pattern="^(filename|lineno|traceback)$"),
+    limit: int = Query(default=20, ge=1, le=200),
+):
+    result = await asyncio.to_thread(tracemalloc_session.diff, group_by, limit)
+    if result is None:
+        raise HTTPException(status_code=409, detail="Take a snapshot first")
+    return result
+
+
+@router.delete("/memory/snapshot")
+async def memory_stop():
+    tracemalloc_session.stop()
+    return {"tracemalloc": False}
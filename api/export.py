@@ -0,0 +1,85 @@
+import csv
+import io
+import json
+import zlib
+from collections.abc import AsyncIterator, Iterable, Sequence
+from datetime import datetime
+from typing import Any
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Table, select
+
+from core.config import settings
+from core.security import require_admin_token
+from db.models import Lead, LeadProfile
+from db.session import engine
+
+router = APIRouter(prefix="/export", tags=["export"], dependencies=[Depends(require_admin_token)])
+
+_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+def _plain(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _ndjson_chunk(columns: Sequence[str], rows: Iterable[Sequence[Any]]) -> str:
+    return "".join(json.dumps(dict(zip(columns, map(_plain, row))), ensure_ascii=False) + "\n" for row in rows)
+
+
+def _csv_chunk(rows: Iterable[Sequence[Any]]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_plain(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+
+async def _export_rows(table: Table, fmt: str, compress: bool) -> AsyncIterator[bytes]:
+    columns = [column.name for column in table.columns]
+    # gzip container (wbits=31), flushed per batch so the client receives data as it goes.
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def encode(text: str) -> bytes:
+        data = text.encode("utf-8")
+        if compressor is None:
+            return data
+        return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    if fmt == "csv":
+        yield encode(_csv_chunk([columns]))
+
+    query = select(table).order_by(table.c.id).execution_options(yield_per=max(settings.EXPORT_BATCH_SIZE, 1))
+    async with engine.connect() as conn:
+        # Server-side cursor: only one batch of rows is in memory at a time.
+        result = await conn.stream(query)
+        async for rows in result.partitions():
+            chunk = _csv_chunk(rows) if fmt == "csv" else _ndjson_chunk(columns, rows)
+            yield encode(chunk)
+
+    if compressor is not None:
+        yield compressor.flush()
+
+
+def _export_response(table: Table, name: str, fmt: str, compress: bool) -> StreamingResponse:
+    filename = f"{name}.{fmt}" + (".gz" if compress else "")
+    return StreamingResponse(
+        _export_rows(table, fmt, compress),
+        media_type="application/gzip" if compress else _MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/leads")
+async def export_leads(
+    fmt: str = Query(default="ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    gzip: bool = False,
+):
+    return _export_response(Lead.__table__, "leads", fmt, gzip)
+
+
+@router.get("/profiles")
+async def export_profiles(
+    fmt: str = Query(default="ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    gzip: bool = False,
+):
+    return _export_response(LeadProfile.__table__, "lead_profiles", fmt, gzip)
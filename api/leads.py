@@ -1,19 +1,35 @@
-﻿import logging
+﻿import asyncio
+import base64
+import codecs
+import json
+import logging
+from collections.abc import AsyncIterator
+from contextlib import AsyncExitStack
+from datetime import datetime, timezone
 from html import escape
+from typing import Any
 
-from aiogram import Bot
-from aiogram.client.default import DefaultBotProperties
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel, ConfigDict, Field
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from sqlalchemy import String, insert, select, tuple_, type_coerce
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.config import settings
+from core.metrics import NOTIFICATION_SEND_SECONDS, QUEUE_DEPTH
+from core.security import require_admin_token
 from db.models import Lead
-from db.session import async_session
+from db.session import async_session, is_sqlite, write_session
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/leads", tags=["leads"])
 
+BULK_SUMMARY_LINES = 10
+_INVALID_JSON = object()
+# Longest single NDJSON line or array element accepted by /leads/bulk.
+_BULK_MAX_ITEM_CHARS = 64 * 1024
+_BULK_BAD_BODY = "Body must be a JSON array or NDJSON"
+
 
 class LeadCreate(BaseModel):
     source: str = Field(default="telegram", min_length=2, max_length=30)
@@ -40,28 +56,93 @@ def format_lead(lead: Lead) -> str:
     )
 
 
-@router.post("/")
-async def create_lead(data: LeadCreate) -> dict[str, int | str]:
+def _created_at_bound(value: datetime) -> Any:
+    if not is_sqlite:
+        return value
+    # SQLite keeps timestamps as UTC text: CURRENT_TIMESTAMP defaults have no
+    # fraction, so compare with the text as stored or equal values never match.
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    fmt = "%Y-%m-%d %H:%M:%S.%f" if value.microsecond else "%Y-%m-%d %H:%M:%S"
+    return type_coerce(value.strftime(fmt), String)
+
+
+def _encode_cursor(lead: Lead) -> str:
+    raw = json.dumps([lead.created_at.isoformat(), lead.id])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
     try:
-        async with async_session() as session:
-            lead = Lead(**data.model_dump())
-            session.add(lead)
-            await session.commit()
-            await session.refresh(lead)
-    except SQLAlchemyError as exc:
-        logger.exception("Failed to save lead")
-        raise HTTPException(status_code=500, detail="Failed to save lead") from exc
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, lead_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(lead_id)
+    except (ValueError, TypeError) as exc:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from exc
+
+
+def _lead_row(lead: Lead) -> dict[str, Any]:
+    return {
+        "id": lead.id,
+        "source": lead.source,
+        "status": lead.status,
+        "name": lead.name,
+        "company": lead.company,
+        "service": lead.service,
+        "budget": lead.budget,
+        "contact": lead.contact,
+        "details": lead.details,
+        "created_at": lead.created_at.isoformat(),
+    }
+
+
+@router.get("/", dependencies=[Depends(require_admin_token)])
+async def list_leads(
+    status: str | None = Query(default=None, max_length=20),
+    source: str | None = Query(default=None, max_length=30),
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    cursor: str | None = None,
+    limit: int = Query(default=50, ge=1, le=500),
+) -> dict[str, Any]:
+    # Newest first. The cursor is the (created_at, id) of the last row, so each
+    # page is an index range scan instead of an OFFSET that grows with the table.
+    query = select(Lead).order_by(Lead.created_at.desc(), Lead.id.desc()).limit(limit + 1)
+    if status:
+        query = query.where(Lead.status == status)
+    if source:
+        query = query.where(Lead.source == source)
+    if created_from is not None:
+        query = query.where(Lead.created_at >= _created_at_bound(created_from))
+    if created_to is not None:
+        query = query.where(Lead.created_at < _created_at_bound(created_to))
+    if cursor:
+        created_at, lead_id = _decode_cursor(cursor)
+        query = query.where(tuple_(Lead.created_at, Lead.id) < tuple_(_created_at_bound(created_at), lead_id))
+
+    async with async_session() as session:
+        result = await session.execute(query)
+        leads = list(result.scalars().all())
+
+    next_cursor = _encode_cursor(leads[limit - 1]) if len(leads) > limit else None
+    return {"items": [_lead_row(lead) for lead in leads[:limit]], "next_cursor": next_cursor}
 
+
+async def _notify_managers(text: str, kind: str) -> None:
     try:
         chat_ids = settings.notification_chat_ids()
         if settings.BOT_TOKEN and chat_ids:
+            from aiogram import Bot
+            from aiogram.client.default import DefaultBotProperties
+
             bot = Bot(
                 settings.BOT_TOKEN,
                 default=DefaultBotProperties(parse_mode="HTML"),
             )
             for chat_id in chat_ids:
                 try:
-                    await bot.send_message(chat_id, format_lead(lead))
+                    with NOTIFICATION_SEND_SECONDS.time(kind):
+                        await bot.send_message(chat_id, text)
                 except Exception:
                     logger.exception("Failed to notify chat_id=%s", chat_id)
             await bot.session.close()
@@ -69,4 +150,281 @@ async def create_lead(data: LeadCreate) -> dict[str, int | str]:
         # Лид уже сохранен, не ломаем ответ клиенту из-за проблем с уведомлением.
         logger.exception("Failed to send lead notification")
 
+
+@router.post("/")
+async def create_lead(data: LeadCreate) -> dict[str, int | str]:
+    try:
+        if settings.LEADS_GROUP_COMMIT:
+            values = data.model_dump()
+            lead = Lead(id=await lead_writer.submit(values), **values)
+        else:
+            async with write_session() as session:
+                lead = Lead(**data.model_dump())
+                session.add(lead)
+                await session.commit()
+                await session.refresh(lead)
+    except SQLAlchemyError as exc:
+        logger.exception("Failed to save lead")
+        raise HTTPException(status_code=500, detail="Failed to save lead") from exc
+
+    await _notify_managers(format_lead(lead), kind="lead")
     return {"status": "ok", "lead_id": lead.id}
+
+
+class _NdjsonItems:
+    def __init__(self) -> None:
+        self._tail = ""
+
+    def feed(self, text: str, final: bool = False) -> list[Any]:
+        lines = (self._tail + text).split("\n")
+        self._tail = "" if final else lines.pop()
+        if len(self._tail) > _BULK_MAX_ITEM_CHARS:
+            raise HTTPException(status_code=400, detail="NDJSON line is too long")
+        items: list[Any] = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                # Keep the position so the error points at the right row.
+                items.append(_INVALID_JSON)
+        return items
+
+
+class _JsonArrayItems:
+    # Incremental reader for a top-level JSON array: yields elements as soon
+    # as they are complete instead of parsing the whole body at once.
+    def __init__(self) -> None:
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._expect = "["
+
+    def feed(self, text: str, final: bool = False) -> list[Any]:
+        buffer = self._buffer + text
+        items: list[Any] = []
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                pos += 1
+            if pos == len(buffer):
+                break
+            char = buffer[pos]
+            if self._expect == "[" and char == "[":
+                self._expect = "value_or_end"
+            elif self._expect in ("value_or_end", "comma_or_end") and char == "]":
+                self._expect = "end"
+            elif self._expect == "comma_or_end" and char == ",":
+                self._expect = "value"
+            elif self._expect in ("value_or_end", "value"):
+                try:
+                    item, end = self._decoder.raw_decode(buffer, pos)
+                except ValueError:
+                    if final:
+                        raise HTTPException(status_code=400, detail=_BULK_BAD_BODY) from None
+                    break
+                if end == len(buffer) and not final:
+                    # A number or literal may continue in the next chunk.
+                    break
+                items.append(item)
+                self._expect = "comma_or_end"
+                pos = end
+                continue
+            else:
+                raise HTTPException(status_code=400, detail=_BULK_BAD_BODY)
+            pos += 1
+
+        self._buffer = buffer[pos:]
+        if len(self._buffer) > _BULK_MAX_ITEM_CHARS:
+            raise HTTPException(status_code=400, detail="Array element is too long or not valid JSON")
+        if final and self._expect != "end":
+            raise HTTPException(status_code=400, detail=_BULK_BAD_BODY)
+        return items
+
+
+async def _iter_bulk_items(request: Request) -> AsyncIterator[Any]:
+    content_type = request.headers.get("content-type", "")
+    ndjson = "ndjson" in content_type or "jsonlines" in content_type
+    reader = _NdjsonItems() if ndjson else _JsonArrayItems()
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    max_bytes = settings.LEADS_BULK_MAX_BYTES
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_bytes:
+                raise HTTPException(status_code=413, detail=f"Body is larger than {max_bytes} bytes")
+            for item in reader.feed(decoder.decode(chunk)):
+                yield item
+        for item in reader.feed(decoder.decode(b"", final=True), final=True):
+            yield item
+    except UnicodeDecodeError as exc:
+        raise HTTPException(status_code=400, detail="Body must be UTF-8") from exc
+
+
+async def _insert_batch(
+    session: AsyncSession,
+    batch: list[tuple[int, dict[str, Any]]],
+) -> tuple[list[tuple[int, int]], list[dict[str, Any]]]:
+    # Multi-row INSERT ... RETURNING; ids come back in parameter order.
+    statement = insert(Lead).returning(Lead.id, sort_by_parameter_order=True)
+    try:
+        async with session.begin_nested():
+            result = await session.execute(statement, [values for _, values in batch])
+            ids = list(result.scalars().all())
+        return [(index, lead_id) for (index, _), lead_id in zip(batch, ids)], []
+    except SQLAlchemyError as exc:
+        if len(batch) == 1:
+            logger.warning("Bulk lead row %s rejected: %s", batch[0][0], getattr(exc, "orig", exc))
+            return [], [{"index": batch[0][0], "error": type(exc).__name__}]
+
+    # One bad row should not cost the whole batch: retry row by row to find it.
+    created: list[tuple[int, int]] = []
+    failed: list[dict[str, Any]] = []
+    for item in batch:
+        item_created, item_failed = await _insert_batch(session, [item])
+        created.extend(item_created)
+        failed.extend(item_failed)
+    return created, failed
+
+
+class LeadGroupWriter:
+    # Group commit: concurrent create_lead calls within a short window share one
+    # multi-row INSERT and one commit instead of paying for a commit each.
+    def __init__(self) -> None:
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._pending: list[tuple[dict[str, Any], asyncio.Future[int]]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._flushes: set[asyncio.Task] = set()
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def submit(self, values: dict[str, Any]) -> int:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._pending = []
+            self._timer = None
+        future: asyncio.Future[int] = loop.create_future()
+        self._pending.append((values, future))
+        if len(self._pending) >= max(settings.LEADS_GROUP_COMMIT_MAX_BATCH, 1):
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(max(settings.LEADS_GROUP_COMMIT_WINDOW_MS, 0) / 1000, self._start_flush)
+        # Shielded so a disconnected client does not cancel a batch other callers wait on.
+        return await asyncio.shield(future)
+
+    def _start_flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._flush(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: list[tuple[dict[str, Any], asyncio.Future[int]]]) -> None:
+        try:
+            async with write_session() as session:
+                created, failed = await _insert_batch(session, list(enumerate(values for values, _ in batch)))
+                await session.commit()
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        lead_ids = dict(created)
+        if failed:
+            logger.warning("Group commit rejected %s of %s leads", len(failed), len(batch))
+        for index, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            if index in lead_ids:
+                future.set_result(lead_ids[index])
+            else:
+                future.set_exception(SQLAlchemyError("Lead insert rejected"))
+
+
+lead_writer = LeadGroupWriter()
+QUEUE_DEPTH.add_collector(lambda: {("lead_group_commit",): lead_writer.pending()})
+
+
+def _format_bulk_summary(leads: list[dict[str, Any]], total: int) -> str:
+    lines = [f"🧾 <b>Пакет заявок</b>: {total}"]
+    for lead in leads[:BULK_SUMMARY_LINES]:
+        lines.append(
+            f"#{lead['id']} {escape(lead['name'])} — {escape(lead['service'])} "
+            f"({escape(lead['source'])}), {escape(lead['contact'])}"
+        )
+    if total > BULK_SUMMARY_LINES:
+        lines.append(f"…и еще {total - BULK_SUMMARY_LINES}")
+    return "\n".join(lines)
+
+
+@router.post("/bulk", dependencies=[Depends(require_admin_token)])
+async def create_leads_bulk(request: Request) -> dict[str, Any]:
+    # The body is parsed while it streams in and inserted batch by batch, so
+    # neither the body nor the parsed rows are held in memory in full. All
+    # batches share one transaction: a rejected body imports nothing.
+    max_rows = settings.LEADS_BULK_MAX_ROWS
+    batch_size = max(settings.LEADS_BULK_BATCH_SIZE, 1)
+    errors: list[dict[str, Any]] = []
+    created: list[tuple[int, int]] = []
+    summary: list[dict[str, Any]] = []
+    batch: list[tuple[int, dict[str, Any]]] = []
+    received = 0
+
+    async def insert_batch(session: AsyncSession) -> None:
+        batch_created, batch_failed = await _insert_batch(session, batch)
+        created.extend(batch_created)
+        errors.extend(batch_failed)
+        values_by_index = dict(batch)
+        for index, lead_id in batch_created[: BULK_SUMMARY_LINES - len(summary)]:
+            summary.append({"id": lead_id, **values_by_index[index]})
+        batch.clear()
+
+    try:
+        async with AsyncExitStack() as stack:
+            session: AsyncSession | None = None
+            async for item in _iter_bulk_items(request):
+                if received >= max_rows:
+                    raise HTTPException(status_code=413, detail=f"At most {max_rows} leads per request")
+                index = received
+                received += 1
+                if item is _INVALID_JSON:
+                    errors.append({"index": index, "error": "invalid JSON"})
+                    continue
+                try:
+                    batch.append((index, LeadCreate.model_validate(item).model_dump()))
+                except ValidationError as exc:
+                    errors.append({"index": index, "error": exc.errors(include_url=False, include_context=False)})
+                    continue
+                if len(batch) >= batch_size:
+                    # Opened on the first full batch, so small bodies are read before taking the writer.
+                    if session is None:
+                        session = await stack.enter_async_context(write_session())
+                    await insert_batch(session)
+
+            if batch:
+                if session is None:
+                    session = await stack.enter_async_context(write_session())
+                await insert_batch(session)
+            if session is not None:
+                await session.commit()
+    except SQLAlchemyError as exc:
+        logger.exception("Failed to save lead batch")
+        raise HTTPException(status_code=500, detail="Failed to save leads") from exc
+    errors.sort(key=lambda item: item["index"])
+
+    if created:
+        await _notify_managers(_format_bulk_summary(summary, len(created)), kind="lead_batch")
+
+    return {
+        "status": "ok",
+        "received": received,
+        "created": [{"index": index, "lead_id": lead_id} for index, lead_id in created],
+        "errors": errors,
+    }
@@ -1,29 +1,48 @@
 ﻿import logging
+import time
+from typing import TYPE_CHECKING
 
-from aiogram import Bot
-from aiogram.client.default import DefaultBotProperties
-from aiogram.dispatcher.event.bases import UNHANDLED
-from aiogram.types import Update
 from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import Response
 
+from api.debug import router as debug_router
+from api.export import router as export_router
 from api.leads import router as leads_router
 from api.meta import router as meta_router
-from bot.assistant_engine import SalesAssistant
-from bot.dispatcher import build_dispatcher
-from bot.lead_capture import process_lead_capture
+from api.usage import router as usage_router
+from bot import warmup
 from core.config import settings
-from core.security import is_admin_payload
+from core.http import close_http_clients
+from core.logs import diagnostics_sampled, setup_logging, stop_logging
+from core.message_log import message_log
+from core.metering import meter_turn, timed, usage_aggregator
+from core.metrics import CONTENT_TYPE, HTTP_REQUEST_SECONDS, registry
+from core.profiling import request_profiler
+from core.security import is_admin_payload, metrics_access_error
+from core.tracing import span, trace_exporter, trace_turn
 from db.init import ensure_db_schema
+from db.session import unit_of_work
+
+if TYPE_CHECKING:
+    from aiogram import Bot, Dispatcher
+
+    from bot.assistant_engine import SalesAssistant
 
 app = FastAPI(title="BitX API")
 logger = logging.getLogger(__name__)
 
 app.include_router(leads_router)
 app.include_router(meta_router)
+app.include_router(usage_router)
+app.include_router(debug_router)
+app.include_router(export_router)
 
-bot: Bot | None = None
-dp = build_dispatcher()
-webhook_assistant = SalesAssistant()
+# aiogram, the dispatcher and the assistant stack are imported on first use:
+# a serverless cold start that only serves /health or a Meta webhook never pays for them.
+bot: "Bot | None" = None
+_dispatcher: "Dispatcher | None" = None
+_webhook_assistant: "SalesAssistant | None" = None
+_owns_logging = False
 
 FIELD_HINTS: dict[str, tuple[str, ...]] = {
     "name": ("имя", "как вас зовут", "представ"),
@@ -36,12 +55,15 @@ FIELD_HINTS: dict[str, tuple[str, ...]] = {
 }
 
 
-def get_bot() -> Bot:
+def get_bot() -> "Bot":
     global bot
     if bot is not None:
         return bot
     if not settings.BOT_TOKEN:
         raise HTTPException(status_code=503, detail="BOT_TOKEN is not configured")
+    from aiogram import Bot
+    from aiogram.client.default import DefaultBotProperties
+
     bot = Bot(
         settings.BOT_TOKEN,
         default=DefaultBotProperties(parse_mode="HTML"),
@@ -86,6 +108,20 @@ def _extract_private_text_message(payload: dict) -> tuple[int, int | None, str |
     return chat_id, user_id, username, full_name, text
 
 
+def _payload_chat_id(payload: dict) -> int | None:
+    message = payload.get("message") or payload.get("edited_message") or {}
+    return (message.get("chat") or {}).get("id")
+
+
+def _update_correlation_id(payload: dict) -> str:
+    message = payload.get("message") or payload.get("edited_message") or {}
+    chat_id = _payload_chat_id(payload)
+    if chat_id is not None and message.get("message_id") is not None:
+        # Same format as the dispatcher handler, so nested traces line up.
+        return f"tg:{chat_id}:{message['message_id']}"
+    return f"tg:update:{payload.get('update_id')}"
+
+
 def _safe_reply_text(text: str) -> str:
     value = (text or "").strip()
     if not value:
@@ -103,6 +139,120 @@ def _assistant_already_asked(reply_text: str, field: str | None) -> bool:
     return any(token in lowered for token in hints)
 
 
+def _get_dispatcher() -> "Dispatcher":
+    global _dispatcher
+    if _dispatcher is None:
+        from bot.dispatcher import build_dispatcher
+
+        _dispatcher = build_dispatcher()
+    return _dispatcher
+
+
+def _get_webhook_assistant() -> "SalesAssistant":
+    global _webhook_assistant
+    if _webhook_assistant is None:
+        from bot.assistant_engine import SalesAssistant
+
+        _webhook_assistant = SalesAssistant()
+    return _webhook_assistant
+
+
+async def _send_reply(tg_bot: "Bot", chat_id: int, text: str) -> None:
+    with timed("send"):
+        await tg_bot.send_message(chat_id, text, parse_mode=None)
+
+
+async def _send_late_reply(tg_bot: "Bot", chat_id: int, text: str) -> None:
+    reply_text = _safe_reply_text(text)
+    await _send_reply(tg_bot, chat_id, reply_text)
+    message_log.record("telegram", str(chat_id), "out", reply_text)
+    await message_log.flush_if_due()
+
+
+async def _answer_private_message(
+    tg_bot: "Bot",
+    chat_id: int,
+    user_id: int | None,
+    username: str | None,
+    full_name: str | None,
+    text: str,
+) -> None:
+    message_log.record("telegram", str(chat_id), "in", text)
+    from bot.lead_capture import LEAD_SENT_NOTE, process_lead_capture
+
+    # Lead capture makes no LLM call, so it also runs for throttled messages.
+    capture = None
+    try:
+        capture = await process_lead_capture(
+            chat_id=chat_id,
+            user_id=user_id,
+            username=username,
+            full_name=full_name,
+            user_text=text,
+            bot=tg_bot,
+        )
+    except Exception:
+        logger.exception("Lead auto-capture failed in webhook for chat_id=%s", chat_id)
+
+    with span("assistant.reply"):
+        result = await _get_webhook_assistant().reply(
+            chat_id=chat_id,
+            user_text=text,
+            on_late_reply=lambda late_text: _send_late_reply(tg_bot, chat_id, late_text),
+        )
+    if result.throttled:
+        throttled_reply = result.reply
+        if capture is not None and capture.sent:
+            throttled_reply = f"{throttled_reply}\n\n{LEAD_SENT_NOTE}" if throttled_reply else LEAD_SENT_NOTE
+        if throttled_reply:
+            await _send_reply(tg_bot, chat_id, _safe_reply_text(throttled_reply))
+            message_log.record("telegram", str(chat_id), "out", throttled_reply)
+        await message_log.flush_if_due()
+        return
+
+    extra_note = ""
+    if capture is not None:
+        if capture.sent:
+            extra_note = LEAD_SENT_NOTE
+        elif capture.follow_up_question and not _assistant_already_asked(result.reply, capture.follow_up_field):
+            extra_note = capture.follow_up_question
+
+    reply_text = _safe_reply_text(result.reply)
+    if extra_note:
+        reply_text = f"{reply_text}\n\n{extra_note}"[:3500]
+    await _send_reply(tg_bot, chat_id, reply_text)
+    message_log.record("telegram", str(chat_id), "out", reply_text)
+    await message_log.flush_if_due()
+
+    if diagnostics_sampled():
+        logger.info("Telegram direct assistant reply: chat_id=%s", chat_id)
+
+
+@app.middleware("http")
+async def observe_request_time(request: Request, call_next):
+    started = time.perf_counter()
+    status = "500"
+    try:
+        response = await call_next(request)
+        status = str(response.status_code)
+        return response
+    finally:
+        # Route templates, not raw paths, keep label cardinality bounded.
+        route = request.scope.get("route")
+        path = getattr(route, "path", None) or "unmatched"
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, path, status)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    error = metrics_access_error(request.headers)
+    if error is not None:
+        raise HTTPException(status_code=error[0], detail=error[1])
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
+
 @app.get("/")
 async def root():
     return {"status": "ok"}
@@ -110,15 +260,23 @@ async def root():
 
 @app.get("/health")
 async def health():
-    return {"status": "ok", "bot_mode": settings.BOT_MODE}
+    return {"status": "ok", "bot_mode": settings.BOT_MODE, "warmed_up": warmup.warmed_up}
 
 
 @app.on_event("startup")
 async def startup_event():
+    global _owns_logging
+    # API-only deploys (uvicorn api.main:app, Vercel) have no other entry point
+    # that sets logging up; under run.py this is a no-op.
+    _owns_logging = setup_logging()
     try:
         await ensure_db_schema()
     except Exception:
         logger.exception("Failed to initialize DB schema on startup")
+    if settings.WARMUP_ENABLED:
+        # Startup (and so readiness) waits for warm-up, bounded by WARMUP_TIMEOUT_SECONDS.
+        telegram = get_bot() if settings.BOT_MODE == "webhook" and settings.BOT_TOKEN else None
+        await warmup.warm_up(telegram)
 
 
 @app.post("/telegram/webhook")
@@ -136,58 +294,42 @@ async def telegram_webhook(
     try:
         tg_bot = get_bot()
         payload = await request.json()
-
-        # Reliable fallback for plain private messages in webhook mode.
-        extracted = _extract_private_text_message(payload)
-        if settings.ASSISTANT_ENABLED and extracted is not None:
-            chat_id, user_id, username, full_name, text = extracted
-            result = await webhook_assistant.reply(chat_id=chat_id, user_text=text)
-            extra_note = ""
-
-            try:
-                capture = await process_lead_capture(
-                    chat_id=chat_id,
-                    user_id=user_id,
-                    username=username,
-                    full_name=full_name,
-                    user_text=text,
-                    bot=tg_bot,
+        async with (
+            trace_turn("telegram.webhook", _update_correlation_id(payload)),
+            request_profiler.profile("telegram_webhook", _payload_chat_id(payload)),
+        ):
+            # Reliable fallback for plain private messages in webhook mode.
+            extracted = _extract_private_text_message(payload)
+            if settings.ASSISTANT_ENABLED and extracted is not None:
+                async with meter_turn("telegram"), unit_of_work():
+                    await _answer_private_message(tg_bot, *extracted)
+                return {"ok": True}
+
+            from aiogram.dispatcher.event.bases import UNHANDLED
+            from aiogram.types import Update
+
+            update = Update.model_validate(payload, context={"bot": tg_bot})
+            sampled = diagnostics_sampled()
+            if sampled:
+                logger.debug(
+                    "Telegram update received: update_id=%s event_type=%s",
+                    update.update_id,
+                    update.event_type,
+                )
+            result = await _get_dispatcher().feed_update(tg_bot, update)
+            if sampled:
+                logger.debug(
+                    "Telegram update result: update_id=%s event_type=%s result_type=%s",
+                    update.update_id,
+                    update.event_type,
+                    type(result).__name__,
+                )
+            if result is UNHANDLED:
+                logger.info(
+                    "Telegram update unhandled: update_id=%s event_type=%s",
+                    update.update_id,
+                    update.event_type,
                 )
-                if capture.sent:
-                    extra_note = "Спасибо, собрал вашу заявку и передал менеджеру. Скоро с вами свяжемся."
-                elif capture.follow_up_question and not _assistant_already_asked(result.reply, capture.follow_up_field):
-                    extra_note = capture.follow_up_question
-            except Exception:
-                logger.exception("Lead auto-capture failed in webhook for chat_id=%s", chat_id)
-
-            reply_text = _safe_reply_text(result.reply)
-            if extra_note:
-                reply_text = f"{reply_text}\n\n{extra_note}"[:3500]
-            await tg_bot.send_message(chat_id, reply_text, parse_mode=None)
-
-            logger.warning("Telegram direct assistant reply: chat_id=%s", chat_id)
-            return {"ok": True}
-
-        update = Update.model_validate(payload, context={"bot": tg_bot})
-        logger.warning(
-            "Telegram update received: update_id=%s event_type=%s",
-            update.update_id,
-            update.event_type,
-        )
-        result = await dp.feed_update(tg_bot, update)
-        logger.warning(
-            "Telegram update result: update_id=%s event_type=%s result_type=%s result_repr=%r",
-            update.update_id,
-            update.event_type,
-            type(result).__name__,
-            result,
-        )
-        if result is UNHANDLED:
-            logger.warning(
-                "Telegram update unhandled: update_id=%s event_type=%s",
-                update.update_id,
-                update.event_type,
-            )
     except Exception:
         logger.exception("Failed to process telegram webhook update")
     return {"ok": True}
@@ -216,5 +358,11 @@ async def delete_webhook():
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await usage_aggregator.flush()
+    await message_log.flush()
+    await trace_exporter.flush()
+    await close_http_clients()
     if bot is not None:
         await bot.session.close()
+    if _owns_logging:
+        stop_logging()
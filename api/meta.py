@@ -1,18 +1,36 @@
 import logging
-from typing import Any
+import time
+from collections.abc import Awaitable, Callable
+from typing import TYPE_CHECKING, Any
 
-import httpx
-from aiogram import Bot
-from aiogram.client.default import DefaultBotProperties
 from fastapi import APIRouter, HTTPException, Query, Request
 from fastapi.responses import PlainTextResponse
 
-from bot.assistant_engine import SalesAssistant
 from core.config import settings
+from core.http import get_http_client
+from core.message_log import message_log
+from core.metering import meter_turn, timed
+from core.metrics import NOTIFICATION_SEND_SECONDS
+from core.profiling import request_profiler
+from core.tracing import span, trace_turn
+from db.session import unit_of_work
+
+if TYPE_CHECKING:
+    from bot.assistant_engine import SalesAssistant
 
 router = APIRouter(prefix="/webhook", tags=["meta"])
-assistant = SalesAssistant()
 logger = logging.getLogger(__name__)
+_assistant: "SalesAssistant | None" = None
+
+
+def _get_assistant() -> "SalesAssistant":
+    # Imported on first use: aiogram and the assistant stack are not needed to boot the API.
+    global _assistant
+    if _assistant is None:
+        from bot.assistant_engine import SalesAssistant
+
+        _assistant = SalesAssistant()
+    return _assistant
 
 
 def _verify_webhook_token(mode: str | None, token: str | None, challenge: str | None) -> str:
@@ -81,8 +99,8 @@ async def _send_whatsapp_text(to: str, text: str) -> None:
         "type": "text",
         "text": {"body": text},
     }
-    async with httpx.AsyncClient(timeout=20.0) as client:
-        response = await client.post(url, headers=headers, json=payload)
+    with timed("send"):
+        response = await get_http_client("meta").post(url, headers=headers, json=payload)
         response.raise_for_status()
 
 
@@ -109,8 +127,8 @@ async def _send_instagram_text(recipient_id: str, text: str) -> None:
         "messaging_type": "RESPONSE",
         "message": {"text": text},
     }
-    async with httpx.AsyncClient(timeout=20.0) as client:
-        response = await client.post(url, headers=headers, json=payload)
+    with timed("send"):
+        response = await get_http_client("meta").post(url, headers=headers, json=payload)
         response.raise_for_status()
 
 
@@ -119,6 +137,9 @@ async def _notify_managers(channel: str, external_user_id: str, user_text: str,
     if not settings.BOT_TOKEN or not chat_ids:
         return
 
+    from aiogram import Bot
+    from aiogram.client.default import DefaultBotProperties
+
     bot = Bot(settings.BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
     text = (
         "⚠️ <b>Эскалация менеджеру</b>\n"
@@ -130,16 +151,33 @@ async def _notify_managers(channel: str, external_user_id: str, user_text: str,
     try:
         for chat_id in chat_ids:
             try:
-                await bot.send_message(chat_id, text)
+                with NOTIFICATION_SEND_SECONDS.time("escalation"):
+                    await bot.send_message(chat_id, text)
             except Exception:
                 logger.exception("Failed to notify manager chat_id=%s", chat_id)
     finally:
         await bot.session.close()
 
 
-async def _assistant_reply(channel: str, external_user_id: str, user_text: str) -> str:
+async def _assistant_reply(
+    channel: str,
+    external_user_id: str,
+    user_text: str,
+    send: Callable[[str, str], Awaitable[None]],
+) -> str:
     key = f"{channel}:{external_user_id}"
-    result = await assistant.reply(chat_id=key, user_text=user_text)
+
+    async def send_late_reply(late_text: str) -> None:
+        await send(external_user_id, late_text)
+        message_log.record(channel, key, "out", late_text)
+        await message_log.flush_if_due()
+
+    with span("assistant.reply"):
+        result = await _get_assistant().reply(
+            chat_id=key,
+            user_text=user_text,
+            on_late_reply=send_late_reply,
+        )
     if result.escalate:
         await _notify_managers(
             channel=channel,
@@ -174,8 +212,20 @@ async def whatsapp_webhook(request: Request):
     processed = 0
     for sender_id, text in _extract_wa_text_events(payload):
         try:
-            reply = await _assistant_reply("whatsapp", sender_id, text)
-            await _send_whatsapp_text(sender_id, reply)
+            correlation_id = f"whatsapp:{sender_id}:{time.time_ns() // 1_000_000}"
+            async with (
+                trace_turn("whatsapp.message", correlation_id),
+                request_profiler.profile("whatsapp", sender_id),
+                meter_turn("whatsapp"),
+                unit_of_work(),
+            ):
+                message_log.record("whatsapp", f"whatsapp:{sender_id}", "in", text)
+                reply = await _assistant_reply("whatsapp", sender_id, text, _send_whatsapp_text)
+                if not reply:
+                    continue
+                await _send_whatsapp_text(sender_id, reply)
+                message_log.record("whatsapp", f"whatsapp:{sender_id}", "out", reply)
+                await message_log.flush_if_due()
             processed += 1
         except Exception:
             logger.exception("Failed to process WhatsApp event sender=%s", sender_id)
@@ -188,8 +238,20 @@ async def instagram_webhook(request: Request):
     processed = 0
     for sender_id, text in _extract_ig_text_events(payload):
         try:
-            reply = await _assistant_reply("instagram", sender_id, text)
-            await _send_instagram_text(sender_id, reply)
+            correlation_id = f"instagram:{sender_id}:{time.time_ns() // 1_000_000}"
+            async with (
+                trace_turn("instagram.message", correlation_id),
+                request_profiler.profile("instagram", sender_id),
+                meter_turn("instagram"),
+                unit_of_work(),
+            ):
+                message_log.record("instagram", f"instagram:{sender_id}", "in", text)
+                reply = await _assistant_reply("instagram", sender_id, text, _send_instagram_text)
+                if not reply:
+                    continue
+                await _send_instagram_text(sender_id, reply)
+                message_log.record("instagram", f"instagram:{sender_id}", "out", reply)
+                await message_log.flush_if_due()
             processed += 1
         except Exception:
             logger.exception("Failed to process Instagram event sender=%s", sender_id)
@@ -0,0 +1,117 @@
+import json
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+
+from core.config import settings
+from core.metering import LATENCY_BUCKETS_MS, UsageBucket, hist_percentile, usage_aggregator
+from core.security import require_admin_token
+from db.models import UsageMetric
+from db.session import async_session
+
+router = APIRouter(prefix="/usage", tags=["usage"], dependencies=[Depends(require_admin_token)])
+
+
+def _load_hist(raw: str | None) -> list[int]:
+    hist = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+    for index, count in enumerate(json.loads(raw or "[]")[: len(hist)]):
+        hist[index] = int(count)
+    return hist
+
+
+def _bucket_from_row(row: UsageMetric) -> UsageBucket:
+    return UsageBucket(
+        turns=row.turns,
+        input_tokens=row.input_tokens,
+        output_tokens=row.output_tokens,
+        cached_tokens=row.cached_tokens,
+        llm_ms_total=row.llm_ms_total,
+        db_ms_total=row.db_ms_total,
+        send_ms_total=row.send_ms_total,
+        total_ms_total=row.total_ms_total,
+        llm_latency_hist=_load_hist(row.llm_latency_hist),
+        total_latency_hist=_load_hist(row.total_latency_hist),
+    )
+
+
+def _cost_usd(model: str, bucket: UsageBucket, prices: dict[str, tuple[float, float, float]]) -> float | None:
+    price = prices.get(model)
+    if price is None:
+        return None
+    input_price, output_price, cached_price = price
+    uncached = max(bucket.input_tokens - bucket.cached_tokens, 0)
+    total = uncached * input_price + bucket.cached_tokens * cached_price + bucket.output_tokens * output_price
+    return round(total / 1_000_000, 6)
+
+
+def _percentile_ms(hist: list[int], quantile: float) -> float | str | None:
+    value = hist_percentile(hist, quantile)
+    if value == float("inf"):
+        return f">{int(LATENCY_BUCKETS_MS[-1])}"
+    return value
+
+
+def _describe(group: dict[str, dict[str, UsageBucket]], prices: dict[str, tuple[float, float, float]]) -> dict:
+    report: dict[str, dict] = {}
+    for name, by_model in sorted(group.items()):
+        total = UsageBucket()
+        cost = 0.0
+        cost_known = True
+        for model, bucket in by_model.items():
+            total.merge(bucket)
+            model_cost = _cost_usd(model, bucket, prices)
+            if model_cost is None:
+                cost_known = cost_known and bucket.input_tokens == 0 and bucket.output_tokens == 0
+            else:
+                cost += model_cost
+        turns = max(total.turns, 1)
+        report[name] = {
+            "turns": total.turns,
+            "input_tokens": total.input_tokens,
+            "output_tokens": total.output_tokens,
+            "cached_tokens": total.cached_tokens,
+            "cost_usd": round(cost, 6) if cost_known else None,
+            "avg_llm_ms": round(total.llm_ms_total / turns, 1),
+            "avg_db_ms": round(total.db_ms_total / turns, 1),
+            "avg_send_ms": round(total.send_ms_total / turns, 1),
+            "llm_latency_ms": {
+                "p50": _percentile_ms(total.llm_latency_hist, 0.5),
+                "p90": _percentile_ms(total.llm_latency_hist, 0.9),
+                "p99": _percentile_ms(total.llm_latency_hist, 0.99),
+            },
+            "total_latency_ms": {
+                "p50": _percentile_ms(total.total_latency_hist, 0.5),
+                "p90": _percentile_ms(total.total_latency_hist, 0.9),
+                "p99": _percentile_ms(total.total_latency_hist, 0.99),
+            },
+        }
+    return report
+
+
+@router.get("/")
+async def usage_report(hours: int = Query(default=24, ge=1, le=24 * 90)) -> dict:
+    since = datetime.now(timezone.utc) - timedelta(hours=hours)
+    async with async_session() as session:
+        result = await session.execute(select(UsageMetric).where(UsageMetric.period_start >= since))
+        rows = list(result.scalars().all())
+
+    buckets: list[tuple[str, str, UsageBucket]] = [(row.channel, row.model, _bucket_from_row(row)) for row in rows]
+    # Include turns that have not been flushed yet.
+    for (period, channel, model), bucket in usage_aggregator.pending().items():
+        if period >= since:
+            buckets.append((channel, model, bucket))
+
+    by_channel: dict[str, dict[str, UsageBucket]] = defaultdict(lambda: defaultdict(UsageBucket))
+    by_model: dict[str, dict[str, UsageBucket]] = defaultdict(lambda: defaultdict(UsageBucket))
+    for channel, model, bucket in buckets:
+        by_channel[channel][model].merge(bucket)
+        by_model[model][model].merge(bucket)
+
+    prices = settings.llm_pricing()
+    return {
+        "since": since.isoformat(),
+        "by_channel": _describe(by_channel, prices),
+        "by_model": _describe(by_model, prices),
+    }
@@ -0,0 +1,87 @@
+# Cold-start benchmark for the API entrypoint used on Vercel.
+# Each run starts a fresh interpreter and measures importing api.index, the startup
+# hooks, the first /health request and the first Telegram webhook.
+#
+#   python benchmarks/cold_start.py --runs 5
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+CHILD = r"""
+import json, time
+started = time.perf_counter()
+from api.index import app
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app) as client:
+    booted = time.perf_counter()
+    client.get("/health")
+    health = time.perf_counter()
+    client.post("/telegram/webhook", json={
+        "update_id": 1,
+        "message": {
+            "message_id": 1,
+            "date": 0,
+            "chat": {"id": 1, "type": "private"},
+            "from": {"id": 1, "is_bot": False, "first_name": "Bench"},
+            "text": "hello",
+        },
+    })
+    webhook = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "startup_ms": (booted - imported) * 1000,
+    "first_health_ms": (health - booted) * 1000,
+    "first_webhook_ms": (webhook - health) * 1000,
+    "total_ms": (webhook - started) * 1000,
+}))
+"""
+
+
+def run_once(env: dict[str, str]) -> dict[str, float]:
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "PYTHONPATH": str(PROJECT_ROOT),
+            "DATABASE_URL": f"sqlite+aiosqlite:///{tmp}/bench.db",
+            "BOT_MODE": "webhook",
+            "BOT_TOKEN": "123456:bench",
+            "WEBHOOK_SECRET_TOKEN": "",
+            "ASSISTANT_ENABLED": "false",
+            "LOG_LEVEL": "ERROR",
+        }
+        # The first run creates the schema; the rest find a current marker.
+        first = run_once(env)
+        samples = [run_once(env) for _ in range(max(args.runs, 1))]
+
+    print(f"first run (empty DB): {json.dumps({key: round(value, 1) for key, value in first.items()})}")
+    for key in first:
+        values = [sample[key] for sample in samples]
+        print(f"{key:>18}: median {statistics.median(values):8.1f} ms  min {min(values):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
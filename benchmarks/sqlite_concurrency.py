@@ -0,0 +1,117 @@
+# SQLite concurrency benchmark: default rollback journal vs the WAL profile with
+# the single-writer queue (SQLITE_WAL). Several processes share one database file,
+# as the bot and the API do, and each runs concurrent read-modify-write turns
+# shaped like lead capture next to plain reads.
+#
+#   python benchmarks/sqlite_concurrency.py --processes 2 --tasks 20 --turns 25
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+CHILD = r"""
+import asyncio, json, sys, time
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from core.metering import metered_session
+from db.models import Lead, LeadProfile
+
+worker, tasks, turns = (int(value) for value in sys.argv[1:4])
+stats = {"writes": 0, "reads": 0, "locked": 0, "errors": 0}
+
+
+async def write_turn(chat_id):
+    async with metered_session(write=True) as session:
+        result = await session.execute(select(LeadProfile).where(LeadProfile.chat_id == chat_id))
+        profile = result.scalar_one_or_none()
+        if profile is None:
+            profile = LeadProfile(chat_id=chat_id, message_count=0)
+            session.add(profile)
+        profile.message_count = int(profile.message_count or 0) + 1
+        session.add(Lead(source="bench", name="n", company="c", service="s", budget="b", contact="x", details="d"))
+        await session.commit()
+
+
+async def read_turn(chat_id):
+    async with metered_session() as session:
+        await session.execute(select(LeadProfile).where(LeadProfile.chat_id == chat_id))
+
+
+async def run_task(index):
+    chat_id = worker * 1_000_000 + index
+    for turn in range(turns):
+        write = turn % 2 == 0
+        try:
+            await (write_turn(chat_id) if write else read_turn(chat_id))
+            stats["writes" if write else "reads"] += 1
+        except OperationalError as exc:
+            stats["locked" if "locked" in str(exc) else "errors"] += 1
+
+
+async def main():
+    started = time.perf_counter()
+    await asyncio.gather(*(run_task(index) for index in range(tasks)))
+    stats["seconds"] = time.perf_counter() - started
+    print(json.dumps(stats))
+
+
+asyncio.run(main())
+"""
+
+
+def run_mode(tmp: str, wal: bool, args: argparse.Namespace) -> dict[str, float]:
+    db_path = Path(tmp) / f"bench-{'wal' if wal else 'default'}.db"
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(PROJECT_ROOT),
+        "DATABASE_URL": f"sqlite+aiosqlite:///{db_path}",
+        "SQLITE_WAL": "true" if wal else "false",
+        "LOG_LEVEL": "CRITICAL",
+    }
+    subprocess.run([sys.executable, "init_db.py"], cwd=PROJECT_ROOT, env=env, check=True, capture_output=True)
+
+    children = [
+        subprocess.Popen(
+            [sys.executable, "-c", CHILD, str(worker), str(args.tasks), str(args.turns)],
+            cwd=PROJECT_ROOT,
+            env=env,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        for worker in range(max(args.processes, 1))
+    ]
+    totals = {"writes": 0, "reads": 0, "locked": 0, "errors": 0, "seconds": 0.0}
+    for child in children:
+        output, _ = child.communicate()
+        result = json.loads(output.strip().splitlines()[-1])
+        for key in ("writes", "reads", "locked", "errors"):
+            totals[key] += result[key]
+        totals["seconds"] = max(totals["seconds"], result["seconds"])
+    return totals
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--tasks", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=25)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, wal in (("default journal", False), ("WAL + writer queue", True)):
+            result = run_mode(tmp, wal, args)
+            ops = result["writes"] + result["reads"]
+            print(
+                f"{label:>20}: {ops / result['seconds']:8.1f} ops/s  "
+                f"writes {result['writes']:5d}  reads {result['reads']:5d}  "
+                f"locked {result['locked']:4d}  other errors {result['errors']:3d}"
+            )
+
+
+if __name__ == "__main__":
+    main()
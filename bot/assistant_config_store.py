@@ -1,7 +1,7 @@
 import logging
 
+from core.metering import metered_session
 from db.models import AssistantConfig
-from db.session import async_session
 
 logger = logging.getLogger(__name__)
 
@@ -10,7 +10,7 @@ _CONFIG_ID = 1
 
 async def get_custom_prompt() -> str | None:
     try:
-        async with async_session() as session:
+        async with metered_session() as session:
             config = await session.get(AssistantConfig, _CONFIG_ID)
             value = (config.custom_prompt if config else "") or ""
             cleaned = value.strip()
@@ -26,7 +26,7 @@ async def set_custom_prompt(prompt: str | None) -> None:
         value = value[:8000]
     stored = value or None
 
-    async with async_session() as session:
+    async with metered_session(write=True) as session:
         config = await session.get(AssistantConfig, _CONFIG_ID)
         if config is None:
             config = AssistantConfig(id=_CONFIG_ID, custom_prompt=stored)
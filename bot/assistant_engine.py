@@ -1,13 +1,31 @@
-﻿import logging
+﻿import asyncio
+import json
+import logging
 import re
+import time
+import weakref
 from collections import defaultdict, deque
+from collections.abc import Awaitable, Callable
 from dataclasses import dataclass
 from typing import Deque
 
 import httpx
 
 from bot.assistant_config_store import get_custom_prompt
+from bot.faq_index import faq_matcher
+from bot.knowledge_base import select_scenario_context
+from bot.lead_capture import get_lead_profile
+from bot.model_router import model_router
+from bot.rate_limit import rate_limiter
+from bot.token_budget import estimate_message_tokens, token_calibration
 from core.config import settings
+from core.http import get_http_client
+from core.logs import diagnostics_sampled
+from core.memory import approx_size, register_memory_probe
+from core.metering import record_background_llm, record_llm
+from core.metrics import HISTORY_STORE, LLM_ERRORS, LLM_REQUEST_SECONDS, QUEUE_DEPTH
+from core.tracing import annotate, span
+from db.session import release_connection
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +48,12 @@ ESCALATION_KEYWORDS = {
     "urgent",
 }
 DISCOUNT_PATTERN = re.compile(r"(\d{1,3})\s*%")
+SUMMARY_SYSTEM_PROMPT = (
+    "Ты ведешь краткую сводку переписки ассистента продаж BITX с клиентом. "
+    "Обнови сводку с учетом новых реплик. Сохрани факты: имя, компания или ниша, задача, "
+    "сроки, бюджет, контакты, договоренности и открытые вопросы. "
+    "Пиши на русском, коротким списком, без приветствий и оценок."
+)
 
 
 @dataclass(slots=True)
@@ -37,6 +61,29 @@ class AssistantResult:
     reply: str
     escalate: bool = False
     reason: str = ""
+    throttled: bool = False
+
+
+@dataclass(slots=True)
+class LLMCall:
+    model: str
+    data: dict | None
+    latency_ms: float
+    usage: dict[str, int] | None
+
+
+@dataclass(slots=True)
+class HistoryItem:
+    role: str
+    text: str
+    tokens: int
+    serialized: str
+
+
+def _serialize_message(role: str, text: str) -> str:
+    content_type = "output_text" if role == "assistant" else "input_text"
+    message = {"role": role, "content": [{"type": content_type, "text": text}]}
+    return json.dumps(message, ensure_ascii=False, separators=(",", ":"))
 
 
 def _extract_output_text(payload: dict) -> str:
@@ -55,11 +102,76 @@ def _extract_output_text(payload: dict) -> str:
     return "\n".join(chunks).strip()
 
 
+def _extract_usage(payload: dict) -> dict[str, int]:
+    usage = payload.get("usage") or {}
+    details = usage.get("input_tokens_details") or {}
+    return {
+        "input_tokens": int(usage.get("input_tokens") or 0),
+        "output_tokens": int(usage.get("output_tokens") or 0),
+        "cached_tokens": int(details.get("cached_tokens") or 0),
+    }
+
+
+def _llm_error_class(status: int, err_code: str) -> str:
+    if err_code == "insufficient_quota":
+        return "quota"
+    if status == 429:
+        return "rate_limited"
+    return f"http_{status // 100}xx"
+
+
+LateReplyCallback = Callable[[str], Awaitable[None]]
+_instances: "weakref.WeakSet[SalesAssistant]" = weakref.WeakSet()
+
+
+def _history_store_stats() -> dict[tuple[str, ...], float]:
+    assistants = list(_instances)
+    return {
+        ("chats",): sum(len(assistant._history) for assistant in assistants),
+        ("messages",): sum(len(items) for assistant in assistants for items in assistant._history.values()),
+        ("tokens",): sum(sum(assistant._history_tokens.values()) for assistant in assistants),
+        ("summaries",): sum(len(assistant._summaries) for assistant in assistants),
+    }
+
+
+def _assistant_queue_depths() -> dict[tuple[str, ...], float]:
+    assistants = list(_instances)
+    return {
+        ("summary_tasks",): sum(len(assistant._summary_tasks) for assistant in assistants),
+        ("late_replies",): sum(len(assistant._late_tasks) for assistant in assistants),
+    }
+
+
+def _memory_probe() -> dict[str, object]:
+    assistants = list(_instances)
+    return {
+        "instances": len(assistants),
+        **{measure: value for (measure,), value in _history_store_stats().items()},
+        "history_bytes": sum(approx_size(assistant._history) for assistant in assistants),
+        "summary_bytes": sum(
+            approx_size(assistant._summaries) + approx_size(assistant._evicted) for assistant in assistants
+        ),
+        "coalesced_bytes": sum(approx_size(assistant._coalesced) for assistant in assistants),
+    }
+
+
+HISTORY_STORE.add_collector(_history_store_stats)
+QUEUE_DEPTH.add_collector(_assistant_queue_depths)
+register_memory_probe("assistant", _memory_probe)
+
+
 class SalesAssistant:
-    def __init__(self) -> None:
-        self._history: dict[str, Deque[dict[str, str]]] = defaultdict(
-            lambda: deque(maxlen=max(settings.ASSISTANT_HISTORY_MESSAGES, 2))
-        )
+    def __init__(self, rate_limited: bool = True) -> None:
+        self._history: dict[str, Deque[HistoryItem]] = defaultdict(deque)
+        self._history_tokens: dict[str, int] = defaultdict(int)
+        self._rate_limited = rate_limited
+        self._coalesced: dict[str, list[str]] = {}
+        self._summaries: dict[str, str] = {}
+        self._evicted: dict[str, list[HistoryItem]] = defaultdict(list)
+        self._summary_tasks: dict[str, asyncio.Task] = {}
+        self._late_tasks: set[asyncio.Task] = set()
+        self._prefix_cache: tuple[str, str] | None = None
+        _instances.add(self)
 
     def _base_system_prompt(self) -> str:
         return (
@@ -77,24 +189,165 @@ class SalesAssistant:
             "Контакты: Telegram @bitx_kg, Instagram @bitx_kg, Email info@bitx.kg."
         )
 
-    async def _build_system_prompt(self) -> str:
+    def _retrieval_query(self, chat_key: str, user_text: str) -> str:
+        # Short follow-ups ("а сколько?") only make sense together with the previous question.
+        for item in reversed(self._history.get(chat_key) or ()):
+            if item.role == "user":
+                return f"{item.text}\n{user_text}"
+        return user_text
+
+    async def _build_system_prompt(self, query: str = "") -> tuple[str, str | None]:
         base = self._base_system_prompt()
-        custom = await get_custom_prompt()
+        with span("prompt.load"):
+            custom = await get_custom_prompt()
         if not custom:
-            return base
-        return f"{base}\n\nДополнительный сценарий от администратора:\n{custom}"
-
-    def _trim_history(self, chat_key: str) -> None:
-        max_chars = max(settings.ASSISTANT_MAX_HISTORY_CHARS, 500)
+            return base, None
+
+        context = select_scenario_context(custom, query)
+        system_prompt = base
+        if context.stable:
+            system_prompt = f"{base}\n\nДополнительный сценарий от администратора:\n{context.stable}"
+        if not context.retrieved:
+            return system_prompt, None
+        return system_prompt, f"Фрагменты сценария администратора по текущему вопросу:\n{context.retrieved}"
+
+    def _serialized_prefix(self, system_prompt: str) -> str:
+        # The system message is byte-identical between turns, so provider-side
+        # prompt caching can reuse it; serialize it once per prompt version.
+        cached = self._prefix_cache
+        if cached is not None and cached[0] == system_prompt:
+            return cached[1]
+        serialized = _serialize_message("system", system_prompt)
+        self._prefix_cache = (system_prompt, serialized)
+        return serialized
+
+    def _request_body(self, model: str, messages: list[str]) -> str:
+        head: dict = {
+            "model": model,
+            "max_output_tokens": settings.ASSISTANT_MAX_TOKENS,
+            "temperature": 0.35,
+        }
+        if settings.ASSISTANT_PROMPT_CACHE_KEY:
+            head["prompt_cache_key"] = settings.ASSISTANT_PROMPT_CACHE_KEY
+        head_json = json.dumps(head, ensure_ascii=False, separators=(",", ":"))
+        return f'{head_json[:-1]},"input":[{",".join(messages)}]}}'
+
+    def _drop_oldest(self, chat_key: str) -> HistoryItem:
+        dropped = self._history[chat_key].popleft()
+        self._history_tokens[chat_key] -= dropped.tokens
+        if settings.ASSISTANT_SUMMARY_ENABLED:
+            evicted = self._evicted[chat_key]
+            evicted.append(dropped)
+            # If summarization keeps failing, only the most recent turns are worth folding in.
+            overflow = len(evicted) - max(settings.ASSISTANT_SUMMARY_TRIGGER_MESSAGES, 2) * 4
+            if overflow > 0:
+                del evicted[:overflow]
+        return dropped
+
+    def _compact_history(self, chat_key: str, max_tokens: int) -> None:
         history = self._history[chat_key]
-        total = sum(len(item.get("text", "")) for item in history)
-        while history and total > max_chars:
-            dropped = history.popleft()
-            total -= len(dropped.get("text", ""))
+        max_messages = max(settings.ASSISTANT_HISTORY_MESSAGES, 2)
+        if len(history) <= max_messages and self._history_tokens[chat_key] <= max_tokens:
+            return
+
+        # Drop a whole block at once, so the remaining history keeps the same
+        # prompt prefix for several turns instead of shifting on every message.
+        block = max(settings.ASSISTANT_HISTORY_COMPACTION_BLOCK, 1)
+        dropped = 0
+        while history and (
+            dropped < block
+            or len(history) > max_messages
+            or self._history_tokens[chat_key] > max_tokens
+        ):
+            self._drop_oldest(chat_key)
+            dropped += 1
 
     def _append_history(self, chat_key: str, role: str, text: str) -> None:
-        self._history[chat_key].append({"role": role, "text": text})
-        self._trim_history(chat_key)
+        tokens = estimate_message_tokens(text)
+        item = HistoryItem(role=role, text=text, tokens=tokens, serialized=_serialize_message(role, text))
+        self._history[chat_key].append(item)
+        self._history_tokens[chat_key] += tokens
+        self._compact_history(chat_key, max(settings.ASSISTANT_MAX_HISTORY_TOKENS, 100))
+
+    def _remember_turn(self, chat_key: str, user_text: str, reply_text: str) -> None:
+        self._append_history(chat_key, "user", user_text)
+        self._append_history(chat_key, "assistant", reply_text)
+        self._maybe_schedule_summary(chat_key)
+
+    def _summary_message(self, chat_key: str) -> str | None:
+        summary = self._summaries.get(chat_key)
+        if not summary:
+            return None
+        return f"Краткое содержание предыдущей части диалога:\n{summary}"
+
+    def _maybe_schedule_summary(self, chat_key: str) -> None:
+        if not settings.ASSISTANT_SUMMARY_ENABLED or not settings.OPENAI_API_KEY:
+            return
+        if len(self._evicted.get(chat_key) or ()) < max(settings.ASSISTANT_SUMMARY_TRIGGER_MESSAGES, 2):
+            return
+        if chat_key in self._summary_tasks:
+            return
+
+        task = asyncio.create_task(self._refresh_summary(chat_key))
+        self._summary_tasks[chat_key] = task
+        task.add_done_callback(lambda _: self._summary_tasks.pop(chat_key, None))
+
+    async def _refresh_summary(self, chat_key: str) -> None:
+        batch = self._evicted.pop(chat_key, [])
+        if not batch:
+            return
+
+        transcript = "\n".join(
+            f"{'Ассистент' if item.role == 'assistant' else 'Клиент'}: {item.text}" for item in batch
+        )
+        previous = self._summaries.get(chat_key) or "нет"
+        payload = {
+            "model": settings.ASSISTANT_SUMMARY_MODEL or settings.OPENAI_MODEL,
+            "input": [
+                {
+                    "role": "system",
+                    "content": [{"type": "input_text", "text": SUMMARY_SYSTEM_PROMPT}],
+                },
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "input_text",
+                            "text": f"Текущая сводка:\n{previous}\n\nНовые реплики:\n{transcript}",
+                        }
+                    ],
+                },
+            ],
+            "max_output_tokens": settings.ASSISTANT_SUMMARY_MAX_TOKENS,
+            "temperature": 0.1,
+        }
+
+        call = await self._call_llm(payload, payload["model"])
+        record_background_llm("summary", call.model, call.latency_ms, call.usage)
+        summary = _extract_output_text(call.data) if call.data is not None else ""
+        if not summary:
+            # Put the turns back so the next attempt still sees them.
+            self._evicted[chat_key][:0] = batch
+            return
+        self._summaries[chat_key] = summary[:4000]
+        logger.info("Conversation summary refreshed: chat_key=%s folded_turns=%s", chat_key, len(batch))
+
+    def _throttled_reply(self, chat_key: str, text: str, first_rejection: bool) -> AssistantResult:
+        if settings.RATE_LIMIT_MODE == "coalesce":
+            # Keep the text and hand it to the LLM together with the next allowed message.
+            pending = self._coalesced.setdefault(chat_key, [])
+            if sum(len(item) for item in pending) + len(text) <= max(settings.RATE_LIMIT_COALESCE_MAX_CHARS, 200):
+                pending.append(text)
+            return AssistantResult(reply="", throttled=True, reason="rate_limited")
+
+        reply = settings.RATE_LIMIT_REPLY if first_rejection else ""
+        return AssistantResult(reply=reply, throttled=True, reason="rate_limited")
+
+    def _merge_coalesced(self, chat_key: str, text: str) -> str:
+        pending = self._coalesced.pop(chat_key, None)
+        if not pending:
+            return text
+        return "\n".join([*pending, text])
 
     def _enforce_discount_rule(self, text: str) -> AssistantResult | None:
         lowered = text.lower()
@@ -137,55 +390,211 @@ class SalesAssistant:
             )
         )
 
-    async def _ask_llm(self, chat_key: str, user_text: str) -> str | None:
+    async def _ask_llm(
+        self,
+        chat_key: str,
+        user_text: str,
+        on_late_reply: LateReplyCallback | None = None,
+    ) -> str | None:
         if not settings.OPENAI_API_KEY:
             return None
 
-        system_prompt = await self._build_system_prompt()
+        query = self._retrieval_query(chat_key, user_text)
+        system_prompt, scenario_text = await self._build_system_prompt(query)
+        summary_text = self._summary_message(chat_key)
+
+        # The whole input payload, not just the history, has to fit the ceiling.
+        reserved = estimate_message_tokens(system_prompt) + estimate_message_tokens(user_text)
+        for extra in (summary_text, scenario_text):
+            if extra:
+                reserved += estimate_message_tokens(extra)
+        history_budget = min(
+            max(settings.ASSISTANT_MAX_HISTORY_TOKENS, 100),
+            settings.ASSISTANT_MAX_PROMPT_TOKENS - reserved,
+        )
+        self._compact_history(chat_key, max(history_budget, 0))
         history = list(self._history[chat_key])
-        input_messages: list[dict] = [
-            {
-                "role": "system",
-                "content": [{"type": "input_text", "text": system_prompt}],
-            }
-        ]
-
-        for item in history:
-            role = item["role"]
-            content_type = "output_text" if role == "assistant" else "input_text"
-            input_messages.append(
-                {
-                    "role": role,
-                    "content": [{"type": content_type, "text": item["text"]}],
-                }
+        prompt_estimate = reserved + sum(item.tokens for item in history)
+
+        # Most stable parts first: system prompt, rolling summary, history.
+        # Per-turn content goes last so it never breaks the cached prefix.
+        messages = [self._serialized_prefix(system_prompt)]
+        if summary_text:
+            messages.append(_serialize_message("system", summary_text))
+        messages.extend(item.serialized for item in history)
+        if scenario_text:
+            messages.append(_serialize_message("system", scenario_text))
+        messages.append(_serialize_message("user", user_text))
+
+        profile = None
+        if settings.ASSISTANT_ROUTING_ENABLED and chat_key.lstrip("-").isdigit():
+            profile = await get_lead_profile(int(chat_key))
+        decision = model_router.route(user_text, len(history), profile)
+        payload = self._request_body(decision.model, messages)
+        await release_connection()
+
+        started = time.perf_counter()
+        with span("llm", model=decision.model, route=decision.route, history_messages=len(history)):
+            if settings.ASSISTANT_SLO_ENABLED:
+                call = await self._post_with_deadline(payload, decision.model, decision.route, chat_key, on_late_reply)
+            else:
+                call = await self._call_llm(payload, decision.model, decision.route)
+            # Wall time the user waited, hedging included; per-call latency is recorded in _call_llm.
+            latency_ms = (time.perf_counter() - started) * 1000
+            usage = call.usage if call is not None else None
+            if usage:
+                annotate(**usage)
+        if usage:
+            token_calibration.observe(prompt_estimate, usage["input_tokens"])
+        record_llm(decision.model, latency_ms, usage)
+        if diagnostics_sampled():
+            logger.info(
+                "Assistant LLM call: chat_key=%s route=%s model=%s reason=%s latency_ms=%.0f "
+                "input_tokens=%s cached_tokens=%s output_tokens=%s",
+                chat_key,
+                decision.route,
+                decision.model,
+                decision.reason,
+                latency_ms,
+                usage["input_tokens"] if usage else "-",
+                usage["cached_tokens"] if usage else "-",
+                usage["output_tokens"] if usage else "-",
             )
+        if call is None or call.data is None:
+            return None
+        answer = _extract_output_text(call.data)
+        return answer or None
+
+    async def _call_llm(
+        self,
+        payload: dict | str,
+        model: str,
+        route: str | None = None,
+        base_url: str | None = None,
+        api_key: str | None = None,
+    ) -> LLMCall:
+        # Every upstream request goes through here, so latency and router stats
+        # cover summaries and hedge legs too. Token billing is left to the caller,
+        # which knows whether the call belongs to the current turn.
+        started = time.perf_counter()
+        data = await self._post_responses(payload, base_url=base_url, api_key=api_key)
+        latency_ms = (time.perf_counter() - started) * 1000
+        usage = _extract_usage(data) if data is not None else None
+        LLM_REQUEST_SECONDS.observe(latency_ms / 1000, model)
+        if route is not None:
+            model_router.record(route, latency_ms, usage)
+        return LLMCall(model=model, data=data, latency_ms=latency_ms, usage=usage)
+
+    def _bill_in_background(self, tasks: set[asyncio.Task], purpose: str) -> None:
+        # Not cancelled: a non-streaming request keeps generating (and billing)
+        # upstream after the client hangs up, so let it finish and count it.
+        def bill(task: asyncio.Task) -> None:
+            self._late_tasks.discard(task)
+            if task.cancelled() or task.exception() is not None:
+                return
+            call = task.result()
+            record_background_llm(purpose, call.model, call.latency_ms, call.usage)
+
+        for task in tasks:
+            self._late_tasks.add(task)
+            task.add_done_callback(bill)
+
+    async def _post_with_deadline(
+        self,
+        payload: dict | str,
+        model: str,
+        route: str,
+        chat_key: str,
+        on_late_reply: LateReplyCallback | None,
+    ) -> LLMCall | None:
+        loop = asyncio.get_running_loop()
+        soft = max(settings.ASSISTANT_SOFT_DEADLINE_SECONDS, 0.1)
+        hard_deadline = loop.time() + max(settings.ASSISTANT_HARD_DEADLINE_SECONDS, soft)
+
+        primary = asyncio.create_task(self._call_llm(payload, model, route))
+        pending: set[asyncio.Task] = {primary}
+        await asyncio.wait(pending, timeout=soft)
+        if primary.done():
+            return primary.result()
+
+        if settings.ASSISTANT_HEDGE_ENABLED:
+            logger.info("Assistant LLM soft deadline missed, hedging: chat_key=%s", chat_key)
+            hedge = asyncio.create_task(
+                self._call_llm(
+                    payload,
+                    model,
+                    route,
+                    base_url=settings.OPENAI_HEDGE_BASE_URL,
+                    api_key=settings.OPENAI_HEDGE_API_KEY,
+                )
+            )
+            pending.add(hedge)
+
+        while pending:
+            remaining = hard_deadline - loop.time()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                call = task.result()
+                if call.data is not None:
+                    self._bill_in_background(pending, "hedge")
+                    return call
+
+        if not pending:
+            return None
 
-        input_messages.append(
-            {
-                "role": "user",
-                "content": [{"type": "input_text", "text": user_text}],
-            }
-        )
-
-        endpoint = f"{settings.OPENAI_BASE_URL.rstrip('/')}/responses"
+        logger.warning("Assistant LLM hard deadline missed: chat_key=%s", chat_key)
+        self._bill_in_background(pending, "late_reply")
+        if on_late_reply is not None and settings.ASSISTANT_LATE_REPLY_MODE == "follow_up":
+            watcher = asyncio.create_task(self._deliver_late_reply(chat_key, pending, on_late_reply))
+            self._late_tasks.add(watcher)
+            watcher.add_done_callback(self._late_tasks.discard)
+        return None
+
+    async def _deliver_late_reply(
+        self,
+        chat_key: str,
+        pending: set[asyncio.Task],
+        on_late_reply: LateReplyCallback,
+    ) -> None:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                call = task.result()
+                answer = _extract_output_text(call.data) if call.data is not None else ""
+                if not answer:
+                    continue
+                self._append_history(chat_key, "assistant", answer)
+                try:
+                    await on_late_reply(answer)
+                except Exception:
+                    logger.exception("Failed to deliver late assistant reply: chat_key=%s", chat_key)
+                return
+
+    async def _post_responses(
+        self,
+        payload: dict | str,
+        base_url: str | None = None,
+        api_key: str | None = None,
+    ) -> dict | None:
+        endpoint = f"{(base_url or settings.OPENAI_BASE_URL).rstrip('/')}/responses"
         headers = {
-            "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
+            "Authorization": f"Bearer {api_key or settings.OPENAI_API_KEY}",
             "Content-Type": "application/json",
         }
-        payload = {
-            "model": settings.OPENAI_MODEL,
-            "input": input_messages,
-            "max_output_tokens": settings.ASSISTANT_MAX_TOKENS,
-            "temperature": 0.35,
-        }
 
         try:
-            async with httpx.AsyncClient(timeout=20.0) as client:
-                response = await client.post(endpoint, headers=headers, json=payload)
+            with span("llm.http"):
+                client = get_http_client("openai")
+                if isinstance(payload, str):
+                    # Pre-serialized body built by _request_body.
+                    response = await client.post(endpoint, headers=headers, content=payload.encode("utf-8"))
+                else:
+                    response = await client.post(endpoint, headers=headers, json=payload)
+                annotate(status=response.status_code)
                 response.raise_for_status()
-                data = response.json()
-                answer = _extract_output_text(data)
-                return answer or None
+                return response.json()
         except httpx.HTTPStatusError as exc:
             status = exc.response.status_code
             body = exc.response.text[:1500]
@@ -195,6 +604,7 @@ class SalesAssistant:
             except Exception:
                 pass
 
+            LLM_ERRORS.inc(_llm_error_class(status, err_code))
             if status == 429 and err_code == "insufficient_quota":
                 logger.warning(
                     "Sales assistant LLM disabled by quota limit: status=%s code=%s body=%s",
@@ -210,28 +620,47 @@ class SalesAssistant:
                     body,
                 )
             return None
-        except httpx.HTTPError:
+        except httpx.HTTPError as exc:
+            LLM_ERRORS.inc("timeout" if isinstance(exc, httpx.TimeoutException) else "transport")
             logger.exception("Sales assistant LLM transport error")
             return None
 
-    async def reply(self, chat_id: str | int, user_text: str) -> AssistantResult:
+    async def reply(
+        self,
+        chat_id: str | int,
+        user_text: str,
+        on_late_reply: LateReplyCallback | None = None,
+    ) -> AssistantResult:
         clean_text = (user_text or "").strip()
         if not clean_text:
             return AssistantResult(reply="Опишите задачу текстом, и я помогу с оценкой.")
 
         chat_key = str(chat_id)
 
+        if self._rate_limited and settings.RATE_LIMIT_ENABLED:
+            decision = rate_limiter.check(chat_key)
+            if not decision.allowed:
+                logger.info("Assistant rate limited: chat_key=%s", chat_key)
+                return self._throttled_reply(chat_key, clean_text, decision.first_rejection)
+            clean_text = self._merge_coalesced(chat_key, clean_text)
+
         forced = self._enforce_discount_rule(clean_text)
         if forced:
-            self._append_history(chat_key, "user", clean_text)
-            self._append_history(chat_key, "assistant", forced.reply)
+            self._remember_turn(chat_key, clean_text, forced.reply)
             return forced
 
-        llm_reply = await self._ask_llm(chat_key=chat_key, user_text=clean_text)
+        # Escalation requests still go through the regular path so managers get notified.
+        if settings.FAQ_ENABLED and not self._needs_escalation(clean_text):
+            faq = await faq_matcher.match(clean_text)
+            if faq is not None:
+                logger.info("Assistant FAQ hit: chat_key=%s entry_id=%s score=%.3f", chat_key, faq.entry_id, faq.score)
+                self._remember_turn(chat_key, clean_text, faq.answer)
+                return AssistantResult(reply=faq.answer, reason="faq")
+
+        llm_reply = await self._ask_llm(chat_key=chat_key, user_text=clean_text, on_late_reply=on_late_reply)
         if not llm_reply:
             fallback = self._fallback_reply(clean_text)
-            self._append_history(chat_key, "user", clean_text)
-            self._append_history(chat_key, "assistant", fallback.reply)
+            self._remember_turn(chat_key, clean_text, fallback.reply)
             return fallback
 
         escalate = self._needs_escalation(clean_text)
@@ -242,6 +671,5 @@ class SalesAssistant:
                 "Чтобы согласовать коммерческие условия, подключаю менеджера."
             )
 
-        self._append_history(chat_key, "user", clean_text)
-        self._append_history(chat_key, "assistant", llm_reply)
+        self._remember_turn(chat_key, clean_text, llm_reply)
         return AssistantResult(reply=llm_reply, escalate=escalate, reason=reason)
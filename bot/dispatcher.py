@@ -1,10 +1,28 @@
+import weakref
+
 from aiogram import Dispatcher
 
 from bot.routers import admin_control, assistant
+from core.memory import register_memory_probe
+
+_dispatchers: "weakref.WeakSet[Dispatcher]" = weakref.WeakSet()
+
+
+def _memory_probe() -> dict[str, object]:
+    dispatchers = list(_dispatchers)
+    return {
+        "dispatchers": len(dispatchers),
+        # MemoryStorage keeps FSM state per chat forever unless it is cleared.
+        "fsm_records": sum(len(getattr(dp.storage, "storage", ())) for dp in dispatchers),
+    }
+
+
+register_memory_probe("aiogram", _memory_probe)
 
 
 def build_dispatcher() -> Dispatcher:
     dp = Dispatcher()
     dp.include_router(admin_control.router)
     dp.include_router(assistant.router)
+    _dispatchers.add(dp)
     return dp
@@ -0,0 +1,143 @@
+import logging
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+import numpy as np
+
+from bot.faq_store import list_faq_entries
+from core.config import settings
+from core.memory import approx_size, register_memory_probe
+
+logger = logging.getLogger(__name__)
+
+NGRAM_SIZE = 3
+_NON_WORD_RE = re.compile(r"[^a-zа-я0-9]+")
+
+
+@dataclass(slots=True)
+class FaqMatch:
+    entry_id: int
+    question: str
+    answer: str
+    score: float
+
+
+def _normalize(text: str) -> str:
+    lowered = (text or "").lower().replace("ё", "е")
+    return " ".join(_NON_WORD_RE.sub(" ", lowered).split())
+
+
+def char_ngrams(text: str) -> list[str]:
+    grams: list[str] = []
+    for word in _normalize(text).split():
+        padded = f" {word} "
+        if len(padded) <= NGRAM_SIZE:
+            grams.append(padded)
+            continue
+        grams.extend(padded[i : i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1))
+    return grams
+
+
+class FaqIndex:
+    def __init__(self, entries: list[tuple[int, str, str]]) -> None:
+        self.entries = entries
+        docs = [Counter(char_ngrams(question)) for _, question, _ in entries]
+        self._vocab: dict[str, int] = {}
+        for doc in docs:
+            for gram in doc:
+                self._vocab.setdefault(gram, len(self._vocab))
+
+        matrix = np.zeros((len(entries), max(len(self._vocab), 1)), dtype=np.float32)
+        for row, doc in enumerate(docs):
+            for gram, count in doc.items():
+                matrix[row, self._vocab[gram]] = 1.0 + np.log(count)
+
+        df = (matrix > 0).sum(axis=0)
+        self._idf = (np.log((1.0 + len(entries)) / (1.0 + df)) + 1.0).astype(np.float32)
+        matrix *= self._idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self._matrix = matrix / np.maximum(norms, 1e-9)
+
+    def match(self, text: str) -> FaqMatch | None:
+        if not self.entries:
+            return None
+        grams = Counter(char_ngrams(text))
+        vector = np.zeros(self._matrix.shape[1], dtype=np.float32)
+        known = 0
+        for gram, count in grams.items():
+            column = self._vocab.get(gram)
+            if column is not None:
+                vector[column] = 1.0 + np.log(count)
+                known += count
+        vector *= self._idf
+        norm = float(np.linalg.norm(vector))
+        if norm == 0.0:
+            return None
+
+        # Unknown n-grams still count towards the query length, so a long message
+        # that merely contains a FAQ phrase does not score as an exact hit.
+        coverage = known / sum(grams.values())
+
+        scores = self._matrix @ (vector / norm)
+        row = int(np.argmax(scores))
+        entry_id, question, answer = self.entries[row]
+        return FaqMatch(entry_id=entry_id, question=question, answer=answer, score=float(scores[row]) * coverage)
+
+
+class FaqMatcher:
+    def __init__(self) -> None:
+        self._index: FaqIndex | None = None
+        self._loaded_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.hits_by_entry: Counter[int] = Counter()
+
+    def invalidate(self) -> None:
+        self._index = None
+
+    async def _get_index(self) -> FaqIndex | None:
+        ttl = max(settings.FAQ_CACHE_TTL_SECONDS, 1)
+        if self._index is not None and time.monotonic() - self._loaded_at < ttl:
+            return self._index
+        try:
+            entries = await list_faq_entries()
+        except Exception:
+            logger.exception("Failed to load FAQ entries")
+            return self._index
+        self._index = FaqIndex([(entry.id, entry.question, entry.answer) for entry in entries])
+        self._loaded_at = time.monotonic()
+        return self._index
+
+    async def match(self, text: str) -> FaqMatch | None:
+        index = await self._get_index()
+        if index is None or not index.entries:
+            return None
+
+        found = index.match(text)
+        if found is None or found.score < settings.FAQ_MATCH_THRESHOLD:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.hits_by_entry[found.entry_id] += 1
+        return found
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+faq_matcher = FaqMatcher()
+
+
+def _memory_probe() -> dict[str, object]:
+    index = faq_matcher._index
+    return {
+        "entries": len(index.entries) if index else 0,
+        "index_bytes": approx_size(index.__dict__) if index else 0,
+        "hits_by_entry": len(faq_matcher.hits_by_entry),
+    }
+
+
+register_memory_probe("faq_index", _memory_probe)
@@ -0,0 +1,31 @@
+from sqlalchemy import delete, select
+
+from core.metering import metered_session
+from db.models import FaqEntry
+
+FAQ_QUESTION_LIMIT = 500
+FAQ_ANSWER_LIMIT = 3000
+
+
+async def list_faq_entries() -> list[FaqEntry]:
+    async with metered_session() as session:
+        result = await session.execute(select(FaqEntry).order_by(FaqEntry.id))
+        return list(result.scalars().all())
+
+
+async def add_faq_entry(question: str, answer: str) -> int:
+    async with metered_session(write=True) as session:
+        entry = FaqEntry(
+            question=question.strip()[:FAQ_QUESTION_LIMIT],
+            answer=answer.strip()[:FAQ_ANSWER_LIMIT],
+        )
+        session.add(entry)
+        await session.commit()
+        return entry.id
+
+
+async def delete_faq_entry(entry_id: int) -> bool:
+    async with metered_session(write=True) as session:
+        result = await session.execute(delete(FaqEntry).where(FaqEntry.id == entry_id))
+        await session.commit()
+        return bool(result.rowcount)
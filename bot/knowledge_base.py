@@ -0,0 +1,125 @@
+import re
+from dataclasses import dataclass
+
+import numpy as np
+
+from core.config import settings
+from core.memory import approx_size, register_memory_probe
+
+WORD_RE = re.compile(r"[a-zа-я0-9]+")
+# Blocks like [CONTACTS_OVERRIDE_START]...[CONTACTS_OVERRIDE_END] must always reach the model.
+PINNED_BLOCK_RE = re.compile(r"\[([A-Z_]+)_START\].*?\[\1_END\]", flags=re.DOTALL)
+# Crude prefix stemming: good enough to match "сайт/сайта/сайты" without a morphology library.
+STEM_LENGTH = 6
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+@dataclass(slots=True)
+class ScenarioContext:
+    # Sent as part of the system prompt; identical from turn to turn.
+    stable: str
+    # Fragments picked for the current message, sent separately after the history.
+    retrieved: str | None = None
+
+
+def tokenize(text: str) -> list[str]:
+    normalized = (text or "").lower().replace("ё", "е")
+    return [word[:STEM_LENGTH] for word in WORD_RE.findall(normalized)]
+
+
+def split_chunks(text: str, chunk_chars: int) -> list[str]:
+    pieces: list[str] = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= chunk_chars:
+            pieces.append(paragraph)
+            continue
+        pieces.extend(line.strip() for line in paragraph.splitlines() if line.strip())
+
+    chunks: list[str] = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + len(piece) + 1 > chunk_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class ScenarioIndex:
+    def __init__(self, chunks: list[str]) -> None:
+        self.chunks = chunks
+        docs = [tokenize(chunk) for chunk in chunks]
+        self._vocab: dict[str, int] = {}
+        for doc in docs:
+            for term in doc:
+                self._vocab.setdefault(term, len(self._vocab))
+
+        tf = np.zeros((len(chunks), max(len(self._vocab), 1)), dtype=np.float32)
+        for row, doc in enumerate(docs):
+            for term in doc:
+                tf[row, self._vocab[term]] += 1.0
+
+        doc_len = tf.sum(axis=1, keepdims=True)
+        avg_len = float(doc_len.mean()) if len(chunks) else 1.0
+        df = (tf > 0).sum(axis=0)
+        idf = np.log(1.0 + (len(chunks) - df + 0.5) / (df + 0.5))
+        norm = BM25_K1 * (1.0 - BM25_B + BM25_B * doc_len / max(avg_len, 1.0))
+        # Per-term BM25 contributions are precomputed, so a query is a column sum.
+        self._weights = (idf * tf * (BM25_K1 + 1.0) / (tf + norm)).astype(np.float32)
+
+    def search(self, query: str, top_k: int) -> list[int]:
+        columns = sorted({self._vocab[term] for term in tokenize(query) if term in self._vocab})
+        if not columns or not self.chunks:
+            return []
+        scores = self._weights[:, columns].sum(axis=1)
+        order = np.argsort(-scores, kind="stable")[: max(top_k, 1)]
+        return [int(row) for row in order if scores[row] > 0]
+
+
+_index_cache: tuple[str, int, ScenarioIndex] | None = None
+
+
+def _get_index(body: str) -> ScenarioIndex:
+    global _index_cache
+    chunk_chars = max(settings.ASSISTANT_SCENARIO_CHUNK_CHARS, 100)
+    if _index_cache is not None and _index_cache[0] == body and _index_cache[1] == chunk_chars:
+        return _index_cache[2]
+    index = ScenarioIndex(split_chunks(body, chunk_chars))
+    _index_cache = (body, chunk_chars, index)
+    return index
+
+
+def _memory_probe() -> dict[str, object]:
+    if _index_cache is None:
+        return {"chunks": 0, "index_bytes": 0}
+    index = _index_cache[2]
+    return {"chunks": len(index.chunks), "index_bytes": approx_size(index.__dict__) + len(_index_cache[0])}
+
+
+register_memory_probe("scenario_index", _memory_probe)
+
+
+def select_scenario_context(scenario: str, query: str) -> ScenarioContext:
+    if not settings.ASSISTANT_SCENARIO_RETRIEVAL_ENABLED:
+        return ScenarioContext(stable=scenario)
+    if len(scenario) < max(settings.ASSISTANT_SCENARIO_RETRIEVAL_MIN_CHARS, 200):
+        return ScenarioContext(stable=scenario)
+
+    pinned = [match.group(0) for match in PINNED_BLOCK_RE.finditer(scenario)]
+    body = PINNED_BLOCK_RE.sub("", scenario).strip()
+    index = _get_index(body)
+    if not index.chunks:
+        return ScenarioContext(stable=scenario)
+
+    rows = index.search(query, settings.ASSISTANT_SCENARIO_TOP_K)
+    if not rows:
+        # Nothing matched: the opening chunk is usually the general description.
+        rows = [0]
+    selected = [index.chunks[row] for row in sorted(rows)]
+    return ScenarioContext(stable="\n\n".join(pinned), retrieved="\n\n".join(selected))
@@ -2,14 +2,19 @@
 import re
 from dataclasses import dataclass, field
 from html import escape
+from typing import TYPE_CHECKING
 
-from aiogram import Bot
-from aiogram.client.default import DefaultBotProperties
 from sqlalchemy import select
 
 from core.config import settings
+from core.logs import diagnostics_sampled
+from core.metering import metered_session
+from core.metrics import LEAD_CAPTURE_OUTCOMES, NOTIFICATION_SEND_SECONDS
+from core.tracing import annotate, span
 from db.models import Lead, LeadProfile
-from db.session import async_session
+
+if TYPE_CHECKING:
+    from aiogram import Bot
 
 logger = logging.getLogger(__name__)
 
@@ -98,6 +103,9 @@ INSIGHT_RULES: tuple[tuple[str, tuple[str, ...]], ...] = (
 )
 
 
+LEAD_SENT_NOTE = "Спасибо, собрал вашу заявку и передал менеджеру. Скоро с вами свяжемся."
+
+
 @dataclass(slots=True)
 class LeadCaptureResult:
     sent: bool = False
@@ -510,16 +518,19 @@ def _reset_profile_after_handoff(profile: LeadProfile, lead_id: int) -> None:
     profile.sent_lead_id = lead_id
 
 
-async def _notify_managers(card_text: str, bot: Bot | None) -> None:
+async def _notify_managers(card_text: str, bot: "Bot | None") -> None:
     chat_ids = settings.notification_chat_ids()
     if not chat_ids:
         return
 
-    created_bot: Bot | None = None
+    created_bot: "Bot | None" = None
     client = bot
     if client is None:
         if not settings.BOT_TOKEN:
             return
+        from aiogram import Bot
+        from aiogram.client.default import DefaultBotProperties
+
         created_bot = Bot(
             settings.BOT_TOKEN,
             default=DefaultBotProperties(parse_mode="HTML"),
@@ -529,7 +540,8 @@ async def _notify_managers(card_text: str, bot: Bot | None) -> None:
     try:
         for chat_id in chat_ids:
             try:
-                await client.send_message(chat_id, card_text)
+                with NOTIFICATION_SEND_SECONDS.time("lead_card"):
+                    await client.send_message(chat_id, card_text)
             except Exception:
                 logger.exception("Failed to send lead card to chat_id=%s", chat_id)
     finally:
@@ -537,6 +549,26 @@ async def _notify_managers(card_text: str, bot: Bot | None) -> None:
             await created_bot.session.close()
 
 
+async def get_lead_profile(chat_id: int) -> LeadProfile | None:
+    try:
+        async with metered_session() as session:
+            result = await session.execute(select(LeadProfile).where(LeadProfile.chat_id == chat_id))
+            return result.scalar_one_or_none()
+    except Exception:
+        logger.exception("Failed to load lead profile for chat_id=%s", chat_id)
+        return None
+
+
+def _capture_outcome(result: LeadCaptureResult) -> str:
+    if result.sent:
+        return "sent"
+    if result.follow_up_question:
+        return "follow_up"
+    if result.missing_fields:
+        return "incomplete"
+    return "skipped"
+
+
 async def process_lead_capture(
     *,
     chat_id: int,
@@ -544,7 +576,35 @@ async def process_lead_capture(
     username: str | None,
     full_name: str | None,
     user_text: str,
-    bot: Bot | None = None,
+    bot: "Bot | None" = None,
+) -> LeadCaptureResult:
+    with span("lead_capture"):
+        try:
+            result = await _capture_lead(
+                chat_id=chat_id,
+                user_id=user_id,
+                username=username,
+                full_name=full_name,
+                user_text=user_text,
+                bot=bot,
+            )
+        except Exception:
+            LEAD_CAPTURE_OUTCOMES.inc("error")
+            raise
+        outcome = _capture_outcome(result)
+        LEAD_CAPTURE_OUTCOMES.inc(outcome)
+        annotate(outcome=outcome)
+        return result
+
+
+async def _capture_lead(
+    *,
+    chat_id: int,
+    user_id: int | None,
+    username: str | None,
+    full_name: str | None,
+    user_text: str,
+    bot: "Bot | None",
 ) -> LeadCaptureResult:
     if not settings.AUTO_LEAD_CAPTURE_ENABLED:
         return LeadCaptureResult()
@@ -557,7 +617,7 @@ async def process_lead_capture(
     profile_snapshot: LeadProfile | None = None
     card_text: str | None = None
 
-    async with async_session() as session:
+    async with metered_session(write=True) as session:
         result = await session.execute(select(LeadProfile).where(LeadProfile.chat_id == chat_id))
         profile = result.scalar_one_or_none()
 
@@ -605,12 +665,13 @@ async def process_lead_capture(
         follow_up_question = _build_follow_up_question(follow_up_field)
 
         if not _is_profile_ready(profile):
-            logger.info(
-                "Lead profile not ready yet: chat_id=%s turns=%s missing=%s",
-                chat_id,
-                int(profile.message_count or 0),
-                ",".join(missing_fields) if missing_fields else "-",
-            )
+            if diagnostics_sampled():
+                logger.info(
+                    "Lead profile not ready yet: chat_id=%s turns=%s missing=%s",
+                    chat_id,
+                    int(profile.message_count or 0),
+                    ",".join(missing_fields) if missing_fields else "-",
+                )
             await session.commit()
             return LeadCaptureResult(
                 sent=False,
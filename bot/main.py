@@ -1,5 +1,4 @@
 import asyncio
-import logging
 import os
 import socket
 import sys
@@ -15,7 +14,17 @@ from aiogram.client.default import DefaultBotProperties
 from aiogram.exceptions import TelegramConflictError
 
 from bot.dispatcher import build_dispatcher
+from bot.sharding import run_sharded_polling
+from bot.warmup import warm_up
 from core.config import settings
+from core.debug_routes import install_debug_routes
+from core.http import close_http_clients
+from core.logs import setup_logging
+from core.message_log import message_log
+from core.metering import usage_aggregator
+from core.metrics import serve_metrics
+from core.security import metrics_access_error
+from core.tracing import trace_exporter
 from db.init import ensure_db_schema
 
 
@@ -33,13 +42,6 @@ def acquire_instance_lock(port: int) -> socket.socket:
     return lock_socket
 
 
-def setup_logging() -> None:
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
-    )
-
-
 async def run_polling() -> None:
     setup_logging()
 
@@ -56,17 +58,33 @@ async def run_polling() -> None:
     )
 
     await ensure_db_schema()
-    dp: Dispatcher = build_dispatcher()
+    # Polling starts only after warm-up finished or hit WARMUP_TIMEOUT_SECONDS.
+    await warm_up(bot)
+
+    metrics_server = None
+    if settings.METRICS_ENABLED and settings.METRICS_PORT:
+        install_debug_routes()
+        metrics_server = await serve_metrics(settings.METRICS_HOST, settings.METRICS_PORT, metrics_access_error)
 
     try:
         try:
-            await dp.start_polling(bot)
+            if settings.BOT_WORKERS > 1:
+                await run_sharded_polling(bot, settings.BOT_WORKERS)
+            else:
+                dp: Dispatcher = build_dispatcher()
+                await dp.start_polling(bot, polling_timeout=settings.BOT_POLLING_TIMEOUT)
         except TelegramConflictError:
             raise RuntimeError(
                 "TelegramConflictError: another getUpdates consumer is using this token. "
                 "Stop duplicate bot instances (local or remote) and run one process only."
             )
     finally:
+        if metrics_server is not None:
+            metrics_server.close()
+        await usage_aggregator.flush()
+        await message_log.flush()
+        await trace_exporter.flush()
+        await close_http_clients()
         await bot.session.close()
         lock_socket.close()
 
@@ -0,0 +1,83 @@
+from collections import defaultdict
+from dataclasses import dataclass
+
+from core.config import settings
+from db.models import LeadProfile
+
+ROUTE_FAST = "fast"
+ROUTE_STRONG = "strong"
+
+
+@dataclass(slots=True)
+class RouteDecision:
+    route: str
+    model: str
+    reason: str
+
+
+@dataclass(slots=True)
+class RouteStats:
+    requests: int = 0
+    failures: int = 0
+    latency_ms_total: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+
+
+def _filled_lead_fields(profile: LeadProfile | None) -> int:
+    if profile is None:
+        return 0
+    values = (profile.name, profile.company, profile.service, profile.budget, profile.contact)
+    return sum(1 for value in values if value)
+
+
+class ModelRouter:
+    def __init__(self) -> None:
+        self.stats: dict[str, RouteStats] = defaultdict(RouteStats)
+
+    def _strong(self, reason: str) -> RouteDecision:
+        return RouteDecision(route=ROUTE_STRONG, model=settings.OPENAI_MODEL, reason=reason)
+
+    def route(self, text: str, history_len: int, profile: LeadProfile | None = None) -> RouteDecision:
+        if not settings.ASSISTANT_ROUTING_ENABLED or not settings.OPENAI_FAST_MODEL:
+            return self._strong("disabled")
+
+        lowered = text.lower()
+        if len(text) >= settings.ROUTING_COMPLEX_MIN_CHARS:
+            return self._strong("long_message")
+        if any(keyword in lowered for keyword in settings.routing_complex_keywords()):
+            return self._strong("keyword")
+        if history_len >= settings.ROUTING_COMPLEX_HISTORY_MESSAGES:
+            return self._strong("long_dialogue")
+        if _filled_lead_fields(profile) >= settings.ROUTING_HANDOFF_MIN_FIELDS:
+            return self._strong("near_handoff")
+        if len(text) <= settings.ROUTING_SIMPLE_MAX_CHARS:
+            return RouteDecision(route=ROUTE_FAST, model=settings.OPENAI_FAST_MODEL, reason="short_message")
+        return self._strong("default")
+
+    def record(self, route: str, latency_ms: float, usage: dict[str, int] | None) -> None:
+        stats = self.stats[route]
+        stats.requests += 1
+        stats.latency_ms_total += latency_ms
+        if usage is None:
+            stats.failures += 1
+            return
+        stats.input_tokens += usage.get("input_tokens", 0)
+        stats.output_tokens += usage.get("output_tokens", 0)
+        stats.cached_tokens += usage.get("cached_tokens", 0)
+
+    def summary_lines(self) -> list[str]:
+        lines: list[str] = []
+        for route, stats in sorted(self.stats.items()):
+            ok = max(stats.requests - stats.failures, 1)
+            lines.append(
+                f"{route}: запросов {stats.requests}, ошибок {stats.failures}, "
+                f"средняя задержка {stats.latency_ms_total / max(stats.requests, 1):.0f} мс, "
+                f"токенов вход/выход в среднем {stats.input_tokens / ok:.0f}/{stats.output_tokens / ok:.0f}, "
+                f"из кэша {stats.cached_tokens / max(stats.input_tokens, 1):.0%}"
+            )
+        return lines
+
+
+model_router = ModelRouter()
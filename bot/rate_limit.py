@@ -0,0 +1,66 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from core.config import settings
+from core.memory import approx_size, register_memory_probe
+
+
+@dataclass(slots=True)
+class TokenBucket:
+    tokens: float
+    updated_at: float
+    rejected: bool = False
+
+
+@dataclass(slots=True)
+class RateLimitDecision:
+    allowed: bool
+    first_rejection: bool = False
+
+
+class RateLimiter:
+    def __init__(self) -> None:
+        self._buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+        self.allowed_total = 0
+        self.limited_total = 0
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def _evict(self) -> None:
+        max_keys = max(settings.RATE_LIMIT_MAX_KEYS, 100)
+        while len(self._buckets) > max_keys:
+            self._buckets.popitem(last=False)
+
+    def check(self, key: str) -> RateLimitDecision:
+        now = time.monotonic()
+        capacity = float(max(settings.RATE_LIMIT_BURST, 1))
+        refill_per_second = max(settings.RATE_LIMIT_PER_MINUTE, 0.0) / 60.0
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(tokens=capacity, updated_at=now)
+            self._buckets[key] = bucket
+            self._evict()
+        else:
+            elapsed = max(now - bucket.updated_at, 0.0)
+            bucket.tokens = min(capacity, bucket.tokens + elapsed * refill_per_second)
+            bucket.updated_at = now
+            self._buckets.move_to_end(key)
+
+        if bucket.tokens >= 1.0:
+            bucket.tokens -= 1.0
+            bucket.rejected = False
+            self.allowed_total += 1
+            return RateLimitDecision(allowed=True)
+
+        first_rejection = not bucket.rejected
+        bucket.rejected = True
+        self.limited_total += 1
+        return RateLimitDecision(allowed=False, first_rejection=first_rejection)
+
+
+# Shared by every SalesAssistant in the process, so one identity has one bucket.
+rate_limiter = RateLimiter()
+register_memory_probe("rate_limiter", lambda: {"keys": len(rate_limiter), "bytes": approx_size(rate_limiter._buckets)})
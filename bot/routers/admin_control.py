@@ -7,11 +7,15 @@ from aiogram.types import Message
 
 from bot.assistant_config_store import get_custom_prompt, set_custom_prompt
 from bot.assistant_engine import SalesAssistant
+from bot.faq_index import faq_matcher
+from bot.faq_store import add_faq_entry, delete_faq_entry, list_faq_entries
+from bot.model_router import model_router
 from core.config import settings
+from core.message_log import message_log
 from core.security import is_admin_message
 
 router = Router()
-assistant = SalesAssistant()
+assistant = SalesAssistant(rate_limited=False)
 
 CHAT_ID_PATTERN = re.compile(r"chat\s*id\s*:\s*(-?\d+)", flags=re.IGNORECASE)
 SEND_PATTERN = re.compile(r"^(?:отправь|перешли|send)\s+(-?\d+)\s+(.+)$", flags=re.IGNORECASE | re.DOTALL)
@@ -39,6 +43,14 @@ CONTACTS_BLOCK_PATTERN = re.compile(
     r"\[CONTACTS_OVERRIDE_START\].*?\[CONTACTS_OVERRIDE_END\]",
     flags=re.IGNORECASE | re.DOTALL,
 )
+ADD_FAQ_PATTERN = re.compile(
+    r"^(?:добавь|добавить|add)\s+(?:faq|вопрос)\s*:?\s*(.+?)\s*(?:=>|->|\|)\s*(.+)$",
+    flags=re.IGNORECASE | re.DOTALL,
+)
+DELETE_FAQ_PATTERN = re.compile(
+    r"^(?:удали|удалить|delete)\s+(?:faq|вопрос)\s*#?(\d+)\s*$",
+    flags=re.IGNORECASE,
+)
 CONTACTS_LINE_PATTERN = re.compile(r"^(telegram|instagram|email|whatsapp)\s*=\s*(.+)$", flags=re.IGNORECASE)
 
 SHOW_SCENARIO_PHRASES = {
@@ -62,6 +74,18 @@ HELP_PHRASES = {
     "что ты умеешь",
     "help",
 }
+SHOW_FAQ_PHRASES = {
+    "faq",
+    "покажи faq",
+    "список faq",
+    "покажи вопросы",
+    "show faq",
+}
+SHOW_ROUTING_PHRASES = {
+    "покажи роутинг",
+    "статистика моделей",
+    "routing stats",
+}
 REPLY_SET_SCENARIO_PHRASES = {
     "сделай это сценарием",
     "используй это как сценарий",
@@ -207,11 +231,39 @@ async def _send_to_target(message: Message, target_chat_id: int, text: str) -> N
         return
     try:
         await message.bot.send_message(target_chat_id, text, parse_mode=None)
+        message_log.record("telegram", str(target_chat_id), "out", text)
+        await message_log.flush_if_due()
         await message.answer(f"Отправлено в chat_id={target_chat_id}.")
     except TelegramBadRequest as exc:
         await message.answer(f"Не удалось отправить: {exc.message}")
 
 
+async def _show_faq(message: Message) -> None:
+    entries = await list_faq_entries()
+    stats = (
+        f"FAQ: {len(entries)} записей. Попаданий: {faq_matcher.hits}, "
+        f"промахов: {faq_matcher.misses}, hit rate: {faq_matcher.hit_rate():.0%}."
+    )
+    if not entries:
+        await message.answer(f"{stats}\nСписок пуст. Пример: добавь faq: Сколько стоит сайт? => От 30 000 сом.")
+        return
+
+    lines = [stats]
+    for entry in entries:
+        hits = faq_matcher.hits_by_entry.get(entry.id, 0)
+        lines.append(f"#{entry.id} ({hits}) {entry.question[:120]} => {entry.answer[:200]}")
+    await message.answer(_safe_text("\n".join(lines)), parse_mode=None)
+
+
+async def _show_routing(message: Message) -> None:
+    mode = "включен" if settings.ASSISTANT_ROUTING_ENABLED else "выключен"
+    lines = [
+        f"Роутинг моделей {mode}: fast={settings.OPENAI_FAST_MODEL or '-'}, strong={settings.OPENAI_MODEL}.",
+        *(model_router.summary_lines() or ["Запросов к LLM пока не было."]),
+    ]
+    await message.answer("\n".join(lines), parse_mode=None)
+
+
 async def _show_help(message: Message) -> None:
     await message.answer(
         "Админ-режим без команд:\n"
@@ -220,7 +272,11 @@ async def _show_help(message: Message) -> None:
         "3) Сбрось сценарий\n"
         "4) Отправь <chat_id> <текст>\n"
         "5) Измени почту на <email>\n"
-        "6) Измени инстаграм на <username>\n\n"
+        "6) Измени инстаграм на <username>\n"
+        "7) Добавь faq: <вопрос> => <ответ>\n"
+        "8) Покажи faq\n"
+        "9) Удали faq <id>\n"
+        "10) Статистика моделей\n\n"
         "Быстрая пересылка: ответь на уведомление с Chat ID и отправь текст/файл, я перешлю клиенту."
     )
 
@@ -243,6 +299,28 @@ async def _handle_admin_message(message: Message) -> None:
         await message.answer("Сценарий сброшен.")
         return
 
+    if normalized in SHOW_FAQ_PHRASES:
+        await _show_faq(message)
+        return
+
+    if normalized in SHOW_ROUTING_PHRASES:
+        await _show_routing(message)
+        return
+
+    faq_add = ADD_FAQ_PATTERN.match(text)
+    if faq_add:
+        entry_id = await add_faq_entry(faq_add.group(1), faq_add.group(2))
+        faq_matcher.invalidate()
+        await message.answer(f"FAQ #{entry_id} добавлен.")
+        return
+
+    faq_delete = DELETE_FAQ_PATTERN.match(text)
+    if faq_delete:
+        deleted = await delete_faq_entry(int(faq_delete.group(1)))
+        faq_matcher.invalidate()
+        await message.answer("FAQ удален." if deleted else "Такой записи FAQ нет.")
+        return
+
     email_update = EMAIL_UPDATE_PATTERN.match(text)
     if email_update:
         await _update_contact_override(message, "email", email_update.group(1))
@@ -289,6 +367,8 @@ async def _handle_admin_message(message: Message) -> None:
     if target_chat_id is not None:
         try:
             await message.copy_to(chat_id=target_chat_id)
+            message_log.record("telegram", str(target_chat_id), "out", message.text or message.caption or "")
+            await message_log.flush_if_due()
             await message.answer(f"Переслал в chat_id={target_chat_id}.")
         except TelegramBadRequest as exc:
             await message.answer(f"Не удалось переслать: {exc.message}")
@@ -4,9 +4,16 @@ from aiogram import Router
 from aiogram.types import Message
 
 from bot.assistant_engine import SalesAssistant
-from bot.lead_capture import process_lead_capture
+from bot.lead_capture import LEAD_SENT_NOTE, process_lead_capture
 from core.config import settings
+from core.logs import diagnostics_sampled
+from core.message_log import message_log
+from core.metering import meter_turn, timed
+from core.metrics import NOTIFICATION_SEND_SECONDS
+from core.profiling import request_profiler
+from core.tracing import span, trace_turn
 from core.security import is_admin_message
+from db.session import unit_of_work
 
 router = Router()
 assistant = SalesAssistant()
@@ -51,7 +58,15 @@ def _assistant_already_asked(reply_text: str, field: str | None) -> bool:
 
 async def _reply_user(message: Message, text: str) -> None:
     # Force plain text to avoid Telegram HTML parse errors from model output.
-    await message.answer(_safe_reply_text(text), parse_mode=None)
+    with timed("send"):
+        await message.answer(_safe_reply_text(text), parse_mode=None)
+
+
+async def _reply_late(message: Message, text: str) -> None:
+    # Follow-up for a reply that missed the SLO deadline, sent after the turn ended.
+    await _reply_user(message, text)
+    message_log.record("telegram", str(message.chat.id), "out", text)
+    await message_log.flush_if_due()
 
 
 async def _notify_managers(message: Message, reason: str) -> None:
@@ -71,7 +86,8 @@ async def _notify_managers(message: Message, reason: str) -> None:
     try:
         for chat_id in target_chat_ids:
             try:
-                await message.bot.send_message(chat_id, text)
+                with NOTIFICATION_SEND_SECONDS.time("escalation"):
+                    await message.bot.send_message(chat_id, text)
             except Exception:
                 logger.exception("Failed to notify manager chat_id=%s", chat_id)
     except Exception:
@@ -80,42 +96,50 @@ async def _notify_managers(message: Message, reason: str) -> None:
 
 async def _handle_message(message: Message) -> None:
     if not settings.ASSISTANT_ENABLED:
-        logger.warning("Assistant skip: disabled")
+        logger.debug("Assistant skip: disabled")
         return
     if message.from_user and message.from_user.is_bot:
-        logger.warning("Assistant skip: from_bot chat_id=%s", getattr(message.chat, "id", None))
+        logger.debug("Assistant skip: from_bot chat_id=%s", getattr(message.chat, "id", None))
         return
     chat = getattr(message, "chat", None)
     if not chat:
-        logger.warning("Assistant skip: no_chat")
+        logger.debug("Assistant skip: no_chat")
         return
     if is_admin_message(message):
-        logger.warning("Assistant skip: admin_identity chat_id=%s", chat.id)
+        logger.debug("Assistant skip: admin_identity chat_id=%s", chat.id)
         return
 
     chat_type = _chat_type(message)
     if chat_type in {"group", "supergroup", "channel"}:
-        logger.warning("Assistant skip: chat_type=%s chat_id=%s", chat_type, chat.id)
+        logger.debug("Assistant skip: chat_type=%s chat_id=%s", chat_type, chat.id)
         return
 
     text = _extract_text(message)
     if not text:
-        logger.warning(
+        logger.debug(
             "Assistant skip: empty_text chat_id=%s chat_type=%s",
             chat.id,
             chat_type,
         )
         return
 
-    logger.warning(
-        "Assistant process: chat_id=%s chat_type=%s text_len=%s",
-        chat.id,
-        chat_type,
-        len(text),
-    )
-    result = await assistant.reply(chat_id=chat.id, user_text=text)
-    extra_note = ""
-
+    correlation_id = f"tg:{chat.id}:{message.message_id}"
+    async with (
+        trace_turn("telegram.message", correlation_id, chat_type=chat_type),
+        request_profiler.profile("telegram_message", chat.id),
+        meter_turn("telegram"),
+        unit_of_work(),
+    ):
+        if diagnostics_sampled():
+            logger.info("Assistant process: chat_id=%s chat_type=%s text_len=%s", chat.id, chat_type, len(text))
+        await _answer_message(message, text)
+
+
+async def _answer_message(message: Message, text: str) -> None:
+    chat = message.chat
+    message_log.record("telegram", str(chat.id), "in", text)
+    # Lead capture makes no LLM call, so it also runs for throttled messages.
+    capture = None
     try:
         capture = await process_lead_capture(
             chat_id=chat.id,
@@ -125,19 +149,41 @@ async def _handle_message(message: Message) -> None:
             user_text=text,
             bot=message.bot,
         )
+    except Exception:
+        logger.exception("Lead auto-capture failed for chat_id=%s", chat.id)
+
+    with span("assistant.reply"):
+        result = await assistant.reply(
+            chat_id=chat.id,
+            user_text=text,
+            on_late_reply=lambda late_text: _reply_late(message, late_text),
+        )
+    if result.throttled:
+        throttled_reply = result.reply
+        if capture is not None and capture.sent:
+            throttled_reply = f"{throttled_reply}\n\n{LEAD_SENT_NOTE}" if throttled_reply else LEAD_SENT_NOTE
+        if throttled_reply:
+            await _reply_user(message, throttled_reply)
+            message_log.record("telegram", str(chat.id), "out", throttled_reply)
+        await message_log.flush_if_due()
+        return
+
+    extra_note = ""
+    if capture is not None:
         if capture.sent:
-            extra_note = "Спасибо, собрал вашу заявку и передал менеджеру. Скоро с вами свяжемся."
+            extra_note = LEAD_SENT_NOTE
         elif capture.follow_up_question and not _assistant_already_asked(result.reply, capture.follow_up_field):
             extra_note = capture.follow_up_question
-    except Exception:
-        logger.exception("Lead auto-capture failed for chat_id=%s", chat.id)
 
     final_reply = result.reply
     if extra_note:
         final_reply = f"{final_reply}\n\n{extra_note}"
 
     await _reply_user(message, final_reply)
-    logger.warning("Assistant replied: chat_id=%s reply_len=%s", chat.id, len(final_reply or ""))
+    message_log.record("telegram", str(chat.id), "out", final_reply)
+    await message_log.flush_if_due()
+    if diagnostics_sampled():
+        logger.info("Assistant replied: chat_id=%s reply_len=%s", chat.id, len(final_reply or ""))
 
     if result.escalate:
         await _notify_managers(message, reason=result.reason)
@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import multiprocessing as mp
+import zlib
+from multiprocessing.process import BaseProcess
+from multiprocessing.queues import Queue
+from typing import Any
+
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.exceptions import TelegramConflictError
+from aiogram.types import Update
+
+from bot.dispatcher import build_dispatcher
+from bot.warmup import warm_up
+from core.config import settings
+from core.debug_routes import install_debug_routes
+from core.http import close_http_clients
+from core.logs import setup_logging
+from core.message_log import message_log
+from core.metering import usage_aggregator
+from core.metrics import QUEUE_DEPTH, serve_metrics
+from core.security import metrics_access_error
+from core.tracing import trace_exporter
+
+logger = logging.getLogger(__name__)
+
+_STOP = None
+
+
+def shard_for_chat(chat_id: int | None, workers: int) -> int:
+    if workers <= 1 or chat_id is None:
+        return 0
+    return zlib.crc32(str(chat_id).encode("ascii")) % workers
+
+
+def _update_chat_id(update: Update) -> int | None:
+    try:
+        event = update.event
+    except Exception:
+        return None
+
+    chat = getattr(event, "chat", None)
+    if chat is None:
+        chat = getattr(getattr(event, "message", None), "chat", None)
+    chat_id = getattr(chat, "id", None)
+    if isinstance(chat_id, int):
+        return chat_id
+
+    user_id = getattr(getattr(event, "from_user", None), "id", None)
+    if isinstance(user_id, int):
+        return user_id
+    return None
+
+
+def _worker_entry(index: int, queue: Queue) -> None:
+    setup_logging()
+    asyncio.run(_run_worker(index, queue))
+
+
+async def _feed_in_order(
+    dp: Any,
+    bot: Bot,
+    payload: dict[str, Any],
+    previous: asyncio.Task | None,
+) -> None:
+    # Updates of one chat are applied strictly one after another.
+    if previous is not None:
+        await asyncio.wait({previous})
+    try:
+        await dp.feed_raw_update(bot, payload)
+    except Exception:
+        logger.exception("Worker failed to process update_id=%s", payload.get("update_id"))
+
+
+async def _run_worker(index: int, queue: Queue) -> None:
+    if not settings.BOT_TOKEN:
+        raise RuntimeError("BOT_TOKEN is not configured")
+
+    bot = Bot(
+        settings.BOT_TOKEN,
+        default=DefaultBotProperties(parse_mode="HTML"),
+    )
+    dp = build_dispatcher()
+    loop = asyncio.get_running_loop()
+    chat_tails: dict[int | None, asyncio.Task] = {}
+    # Bounds in-flight updates, so a busy worker stops draining its queue and
+    # the poller's blocking put slows getUpdates down.
+    in_flight = asyncio.Semaphore(max(settings.BOT_WORKER_MAX_IN_FLIGHT, 1))
+
+    def _release_tail(chat_id: int | None, task: asyncio.Task) -> None:
+        if chat_tails.get(chat_id) is task:
+            chat_tails.pop(chat_id, None)
+
+    metrics_server = None
+    if settings.METRICS_ENABLED and settings.METRICS_PORT:
+        # Each worker has its own registry and memory, so it is scraped and
+        # inspected (/debug/*) on its own port.
+        install_debug_routes()
+        metrics_server = await serve_metrics(
+            settings.METRICS_HOST,
+            settings.METRICS_PORT + 1 + index,
+            metrics_access_error,
+        )
+
+    await warm_up(bot)
+    logger.info("Bot worker started: index=%s", index)
+    try:
+        while True:
+            await in_flight.acquire()
+            item = await loop.run_in_executor(None, queue.get)
+            if item is _STOP:
+                in_flight.release()
+                break
+            chat_id, payload = item
+            task = asyncio.create_task(_feed_in_order(dp, bot, payload, chat_tails.get(chat_id)))
+            chat_tails[chat_id] = task
+            task.add_done_callback(lambda done, key=chat_id: _release_tail(key, done))
+            task.add_done_callback(lambda _: in_flight.release())
+
+        if chat_tails:
+            await asyncio.wait(set(chat_tails.values()))
+    finally:
+        if metrics_server is not None:
+            metrics_server.close()
+        await usage_aggregator.flush()
+        await message_log.flush()
+        await trace_exporter.flush()
+        await close_http_clients()
+        await bot.session.close()
+        logger.info("Bot worker stopped: index=%s", index)
+
+
+def _start_workers(workers: int) -> tuple[list[Queue], list[BaseProcess]]:
+    ctx = mp.get_context("spawn")
+    queue_size = max(settings.BOT_WORKER_QUEUE_SIZE, 1)
+    queues: list[Queue] = []
+    processes: list[BaseProcess] = []
+    for index in range(workers):
+        queue = ctx.Queue(maxsize=queue_size)
+        process = ctx.Process(
+            target=_worker_entry,
+            args=(index, queue),
+            name=f"bot-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        queues.append(queue)
+        processes.append(process)
+    return queues, processes
+
+
+def _stop_workers(queues: list[Queue], processes: list[BaseProcess]) -> None:
+    for queue, process in zip(queues, processes):
+        if process.is_alive():
+            try:
+                queue.put(_STOP, timeout=1.0)
+            except Exception:
+                logger.warning("Failed to send stop signal to %s", process.name)
+    for process in processes:
+        process.join(timeout=10.0)
+        if process.is_alive():
+            logger.warning("Terminating unresponsive %s", process.name)
+            process.terminate()
+            process.join(timeout=1.0)
+
+
+async def run_sharded_polling(bot: Bot, workers: int) -> None:
+    allowed_updates = build_dispatcher().resolve_used_update_types()
+    queues, processes = _start_workers(workers)
+    QUEUE_DEPTH.add_collector(
+        lambda: {(f"bot_worker_{index}",): queue.qsize() for index, queue in enumerate(queues)}
+    )
+    loop = asyncio.get_running_loop()
+    offset: int | None = None
+    logger.info("Sharded polling started: workers=%s", workers)
+
+    try:
+        while True:
+            dead = [process.name for process in processes if not process.is_alive()]
+            if dead:
+                raise RuntimeError(f"Bot workers exited unexpectedly: {', '.join(dead)}")
+
+            try:
+                updates = await bot.get_updates(
+                    offset=offset,
+                    timeout=settings.BOT_POLLING_TIMEOUT,
+                    allowed_updates=allowed_updates,
+                )
+            except TelegramConflictError:
+                raise
+            except Exception:
+                logger.exception("Failed to fetch updates, retrying")
+                await asyncio.sleep(1.0)
+                continue
+
+            for update in updates:
+                offset = update.update_id + 1
+                chat_id = _update_chat_id(update)
+                payload = update.model_dump(mode="json", exclude_none=True, by_alias=True)
+                queue = queues[shard_for_chat(chat_id, workers)]
+                # Blocks once the worker has BOT_WORKER_MAX_IN_FLIGHT updates running
+                # and a full queue, which throttles polling.
+                await loop.run_in_executor(None, queue.put, (chat_id, payload))
+    finally:
+        await loop.run_in_executor(None, _stop_workers, queues, processes)
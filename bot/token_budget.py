@@ -0,0 +1,71 @@
+import logging
+import math
+import re
+
+from core.config import settings
+from core.metrics import TOKEN_ESTIMATE_FACTOR, TOKEN_ESTIMATE_RATIO
+
+logger = logging.getLogger(__name__)
+
+# Rough starting guesses of characters per token for the o200k tokenizer family
+# (gpt-4o / gpt-4.1), not measurements: Cyrillic splits finer than Latin.
+# TokenCalibration corrects the result from the input_tokens the provider reports.
+CYRILLIC_CHARS_PER_TOKEN = 3.2
+LATIN_CHARS_PER_TOKEN = 4.0
+DIGITS_PER_TOKEN = 3.0
+# Role markers and separators the API adds around every message.
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_SEGMENT_RE = re.compile(r"([А-Яа-яЁё]+)|([A-Za-z]+)|(\d+)|(\S)")
+
+# Share of each new observation in the running factor, and the range the factor
+# may drift to. Tiny prompts are skipped: rounding dominates their ratio.
+_CALIBRATION_WEIGHT = 0.05
+_FACTOR_BOUNDS = (0.5, 3.0)
+_MIN_CALIBRATION_TOKENS = 50
+
+
+class TokenCalibration:
+    def __init__(self) -> None:
+        self.factor = min(max(settings.ASSISTANT_TOKEN_ESTIMATE_FACTOR, _FACTOR_BOUNDS[0]), _FACTOR_BOUNDS[1])
+        self.samples = 0
+
+    def observe(self, estimated: int, reported: int) -> None:
+        # estimated is the already corrected estimate of the whole request, so
+        # the ratio is the residual error and is applied multiplicatively.
+        if estimated < _MIN_CALIBRATION_TOKENS or reported <= 0:
+            return
+        ratio = reported / estimated
+        TOKEN_ESTIMATE_RATIO.observe(ratio)
+        if not settings.ASSISTANT_TOKEN_CALIBRATION:
+            return
+        factor = self.factor * ratio**_CALIBRATION_WEIGHT
+        self.factor = min(max(factor, _FACTOR_BOUNDS[0]), _FACTOR_BOUNDS[1])
+        self.samples += 1
+        if self.samples % 100 == 0:
+            logger.info("Token estimate calibration: factor=%.3f samples=%s", self.factor, self.samples)
+
+
+token_calibration = TokenCalibration()
+TOKEN_ESTIMATE_FACTOR.add_collector(lambda: {(): token_calibration.factor})
+
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+
+    total = 0.0
+    for cyrillic, latin, digits, _other in _SEGMENT_RE.findall(text):
+        if cyrillic:
+            total += math.ceil(len(cyrillic) / CYRILLIC_CHARS_PER_TOKEN)
+        elif latin:
+            total += math.ceil(len(latin) / LATIN_CHARS_PER_TOKEN)
+        elif digits:
+            total += math.ceil(len(digits) / DIGITS_PER_TOKEN)
+        else:
+            total += 1
+    return math.ceil(total * token_calibration.factor)
+
+
+def estimate_message_tokens(text: str) -> int:
+    return estimate_tokens(text) + MESSAGE_OVERHEAD_TOKENS
@@ -0,0 +1,68 @@
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING
+
+from bot.assistant_config_store import get_custom_prompt
+from bot.lead_capture import get_lead_profile
+from core.config import settings
+from core.http import preconnect
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
+logger = logging.getLogger(__name__)
+
+# None until warm-up ran; reported by /health.
+warmed_up: bool | None = None
+
+
+async def _warm_db_connection() -> None:
+    # The same statements the first message runs, so their compiled form and
+    # the per-connection prepared statements are cached before traffic arrives.
+    await get_custom_prompt()
+    await get_lead_profile(0)
+
+
+async def _warm_db() -> None:
+    count = max(settings.WARMUP_DB_CONNECTIONS, 1)
+    # Concurrent sessions force the pool to open `count` separate connections.
+    await asyncio.gather(*(_warm_db_connection() for _ in range(count)))
+
+
+async def _warm_telegram(bot: "Bot") -> None:
+    await bot.get_me()
+
+
+async def warm_up(bot: "Bot | None" = None) -> bool:
+    global warmed_up
+    if not settings.WARMUP_ENABLED:
+        return False
+
+    steps = {"db": _warm_db()}
+    if settings.OPENAI_API_KEY:
+        steps["openai"] = preconnect("openai", settings.OPENAI_BASE_URL)
+    if settings.WHATSAPP_ACCESS_TOKEN or settings.INSTAGRAM_ACCESS_TOKEN:
+        steps["meta"] = preconnect("meta", "https://graph.facebook.com")
+    if bot is not None:
+        steps["telegram"] = _warm_telegram(bot)
+
+    started = time.perf_counter()
+    tasks = {name: asyncio.ensure_future(step) for name, step in steps.items()}
+    done, pending = await asyncio.wait(tasks.values(), timeout=max(settings.WARMUP_TIMEOUT_SECONDS, 0.1))
+    for task in pending:
+        task.cancel()
+    failed = [name for name, task in tasks.items() if task in done and task.exception() is not None]
+    timed_out = [name for name, task in tasks.items() if task in pending]
+    for name in failed:
+        logger.warning("Warm-up step failed: %s: %r", name, tasks[name].exception())
+
+    warmed_up = not failed and not timed_out
+    logger.info(
+        "Warm-up finished: elapsed_ms=%.0f steps=%s failed=%s timed_out=%s",
+        (time.perf_counter() - started) * 1000,
+        ",".join(steps),
+        ",".join(failed) or "-",
+        ",".join(timed_out) or "-",
+    )
+    return warmed_up
@@ -5,8 +5,14 @@ class Settings(BaseSettings):
     ADMIN_CHAT_ID: int | None = None
     MANAGER_CHAT_IDS: str | None = None
     BOT_MODE: str = "polling"
+    BOT_WORKERS: int = 1
+    BOT_WORKER_QUEUE_SIZE: int = 1000
+    # Updates one worker processes at once; beyond that its queue fills and polling waits
+    BOT_WORKER_MAX_IN_FLIGHT: int = 64
+    BOT_POLLING_TIMEOUT: int = 10
     WEBHOOK_PATH: str = "/telegram/webhook"
     WEBHOOK_SECRET_TOKEN: str | None = None
+    ADMIN_API_TOKEN: str | None = None
     PUBLIC_BASE_URL: str | None = None
     META_GRAPH_API_VERSION: str = "v20.0"
     WHATSAPP_ACCESS_TOKEN: str | None = None
@@ -15,15 +21,118 @@ class Settings(BaseSettings):
     INSTAGRAM_PAGE_ID: str | None = None
     INSTAGRAM_SEND_API_URL: str | None = None
     DATABASE_URL: str = "sqlite+aiosqlite:///./bitx.db"
+    # auto: create_all only when the schema_meta marker is stale; always | off
+    DB_SCHEMA_SYNC: str = "auto"
+    # auto (null on Vercel, queue elsewhere) | null | queue | pgbouncer
+    DB_POOL_STRATEGY: str = "auto"
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 5
+    DB_POOL_TIMEOUT: float = 10.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Postgres JIT only slows down the short queries this app runs
+    DB_JIT: bool = False
+    # SQLite profile: WAL, synchronous=NORMAL, single queued writer
+    SQLITE_WAL: bool = True
+    SQLITE_BUSY_TIMEOUT_MS: int = 10000
+    SQLITE_MMAP_SIZE: int = 268435456
+    SQLITE_CACHE_SIZE_KB: int = 20000
+    # Rows fetched per server-side cursor round trip in /export
+    EXPORT_BATCH_SIZE: int = 1000
+    LEADS_BULK_MAX_ROWS: int = 5000
+    LEADS_BULK_MAX_BYTES: int = 10_000_000
+    LEADS_BULK_BATCH_SIZE: int = 500
+    # Group commit for POST /leads: concurrent inserts within the window share one transaction
+    LEADS_GROUP_COMMIT: bool = False
+    LEADS_GROUP_COMMIT_WINDOW_MS: float = 5.0
+    LEADS_GROUP_COMMIT_MAX_BATCH: int = 200
+    # message_events: buffered in memory, written in batches (COPY on Postgres)
+    MESSAGE_LOG_ENABLED: bool = True
+    MESSAGE_LOG_FLUSH_SECONDS: int = 5
+    MESSAGE_LOG_BATCH_SIZE: int = 500
+    MESSAGE_LOG_MAX_BUFFER: int = 20000
+    MESSAGE_LOG_TEXT_LIMIT: int = 4000
+    WARMUP_ENABLED: bool = False
+    WARMUP_TIMEOUT_SECONDS: float = 5.0
+    WARMUP_DB_CONNECTIONS: int = 2
     API_BASE: str = "http://127.0.0.1:8000"
     ASSISTANT_ENABLED: bool = True
     OPENAI_API_KEY: str | None = None
     OPENAI_MODEL: str = "gpt-4.1-mini"
     OPENAI_BASE_URL: str = "https://api.openai.com/v1"
+    OPENAI_FAST_MODEL: str | None = "gpt-4.1-nano"
+    OPENAI_HEDGE_BASE_URL: str | None = None
+    OPENAI_HEDGE_API_KEY: str | None = None
     ASSISTANT_HISTORY_MESSAGES: int = 10
-    ASSISTANT_MAX_HISTORY_CHARS: int = 6000
+    ASSISTANT_MAX_HISTORY_TOKENS: int = 1500
+    ASSISTANT_MAX_PROMPT_TOKENS: int = 4000
+    # Starting correction for the local token estimate; refined from reported input_tokens
+    ASSISTANT_TOKEN_ESTIMATE_FACTOR: float = 1.0
+    ASSISTANT_TOKEN_CALIBRATION: bool = True
+    ASSISTANT_HISTORY_COMPACTION_BLOCK: int = 4
+    ASSISTANT_PROMPT_CACHE_KEY: str | None = None
+    ASSISTANT_SUMMARY_ENABLED: bool = True
+    ASSISTANT_SUMMARY_TRIGGER_MESSAGES: int = 4
+    ASSISTANT_SUMMARY_MAX_TOKENS: int = 250
+    ASSISTANT_SUMMARY_MODEL: str | None = None
+    ASSISTANT_SCENARIO_RETRIEVAL_ENABLED: bool = True
+    ASSISTANT_SCENARIO_RETRIEVAL_MIN_CHARS: int = 1500
+    ASSISTANT_SCENARIO_CHUNK_CHARS: int = 400
+    ASSISTANT_SCENARIO_TOP_K: int = 4
+    FAQ_ENABLED: bool = True
+    FAQ_MATCH_THRESHOLD: float = 0.7
+    FAQ_CACHE_TTL_SECONDS: int = 60
+    ASSISTANT_ROUTING_ENABLED: bool = False
+    ROUTING_SIMPLE_MAX_CHARS: int = 60
+    ROUTING_COMPLEX_MIN_CHARS: int = 350
+    ROUTING_COMPLEX_KEYWORDS: str = (
+        "интеграц,api,crm,архитект,техзадан,техническ,требован,договор,оплат,смет,коммерческ"
+    )
+    ROUTING_COMPLEX_HISTORY_MESSAGES: int = 8
+    ROUTING_HANDOFF_MIN_FIELDS: int = 3
+    ASSISTANT_SLO_ENABLED: bool = False
+    ASSISTANT_SOFT_DEADLINE_SECONDS: float = 6.0
+    ASSISTANT_HARD_DEADLINE_SECONDS: float = 12.0
+    ASSISTANT_HEDGE_ENABLED: bool = True
+    # discard | follow_up
+    ASSISTANT_LATE_REPLY_MODE: str = "discard"
     ASSISTANT_MAX_TOKENS: int = 350
     SALES_MAX_DISCOUNT_PCT: int = 15
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BURST: int = 6
+    RATE_LIMIT_PER_MINUTE: float = 12.0
+    RATE_LIMIT_MAX_KEYS: int = 10000
+    # reply | coalesce
+    RATE_LIMIT_MODE: str = "reply"
+    RATE_LIMIT_REPLY: str = "Вы пишете слишком часто. Дайте мне минуту, и я отвечу на все вопросы."
+    RATE_LIMIT_COALESCE_MAX_CHARS: int = 2000
+    METERING_ENABLED: bool = True
+    METERING_FLUSH_SECONDS: int = 60
+    # USD per 1M tokens: model=input/output/cached, comma separated
+    LLM_PRICING: str = "gpt-4.1-mini=0.40/1.60/0.10,gpt-4.1-nano=0.10/0.40/0.025,gpt-4.1=2.00/8.00/0.50"
+    METRICS_ENABLED: bool = True
+    METRICS_TOKEN: str | None = None
+    # /metrics needs METRICS_TOKEN or ADMIN_API_TOKEN unless explicitly opened
+    METRICS_PUBLIC: bool = False
+    # Standalone polling only; the API serves /metrics itself.
+    METRICS_HOST: str = "0.0.0.0"
+    METRICS_PORT: int | None = None
+    TRACING_ENABLED: bool = False
+    TRACING_SAMPLE_RATE: float = 0.1
+    TRACING_FILE: str = "traces.jsonl"
+    # OTLP/HTTP collector base URL, e.g. http://localhost:4318; overrides TRACING_FILE
+    TRACING_OTLP_ENDPOINT: str | None = None
+    TRACING_SERVICE_NAME: str = "bitx-bot"
+    # Finished traces waiting for the background exporter; newer ones are dropped when full
+    TRACING_QUEUE_SIZE: int = 1000
+    TRACING_EXPORT_BATCH: int = 100
+    LOG_LEVEL: str = "INFO"
+    # text | json
+    LOG_FORMAT: str = "text"
+    # Share of messages whose per-message diagnostic lines are logged
+    LOG_SAMPLE_RATE: float = 0.1
+    PROFILE_DIR: str = "profiles"
+    PROFILE_SAMPLE_INTERVAL_MS: int = 5
     AUTO_LEAD_CAPTURE_ENABLED: bool = True
     AUTO_LEAD_MIN_MESSAGES: int = 3
     AUTO_LEAD_MIN_DETAILS_CHARS: int = 60
@@ -54,4 +163,21 @@ class Settings(BaseSettings):
                 ids.append(value)
         return ids
 
+    def routing_complex_keywords(self) -> list[str]:
+        raw = (self.ROUTING_COMPLEX_KEYWORDS or "").replace(";", ",")
+        return [part.strip().lower() for part in raw.split(",") if part.strip()]
+
+    def llm_pricing(self) -> dict[str, tuple[float, float, float]]:
+        prices: dict[str, tuple[float, float, float]] = {}
+        for part in (self.LLM_PRICING or "").replace(";", ",").split(","):
+            model, _, raw = part.partition("=")
+            values = raw.split("/")
+            if not model.strip() or len(values) != 3:
+                continue
+            try:
+                prices[model.strip()] = (float(values[0]), float(values[1]), float(values[2]))
+            except ValueError:
+                continue
+        return prices
+
 settings = Settings()
@@ -0,0 +1,96 @@
+import asyncio
+import json
+from collections.abc import Awaitable, Callable
+from typing import Any
+from urllib.parse import parse_qsl
+
+from core.memory import memory_report, tracemalloc_session
+from core.metrics import RouteHandler, register_route
+from core.profiling import ProfileIn, profile_request, request_profiler
+from core.security import admin_token_error
+
+# Same endpoints as api/debug.py, served on the metrics port of processes
+# without the API: the polling bot and each BOT_WORKERS shard worker.
+DebugHandler = Callable[[dict[str, str], bytes], Awaitable[tuple[int, Any]]]
+
+_GROUP_BY = ("filename", "lineno", "traceback")
+
+
+def _int_param(params: dict[str, str], name: str, default: int, low: int, high: int) -> int:
+    raw = params.get(name)
+    if raw is None:
+        return default
+    value = int(raw)
+    if not low <= value <= high:
+        raise ValueError(f"{name} must be between {low} and {high}")
+    return value
+
+
+def _group_by(params: dict[str, str]) -> str:
+    value = params.get("group_by", "filename")
+    if value not in _GROUP_BY:
+        raise ValueError(f"group_by must be one of {', '.join(_GROUP_BY)}")
+    return value
+
+
+def _admin_json(handler: DebugHandler) -> RouteHandler:
+    async def route(query: str, headers: dict[str, str], body: bytes) -> tuple[int, str, bytes]:
+        error = admin_token_error(headers.get("x-admin-token"))
+        if error is not None:
+            status, payload = error[0], {"detail": error[1]}
+        else:
+            try:
+                status, payload = await handler(dict(parse_qsl(query)), body)
+            except ValueError as exc:
+                status, payload = 400, {"detail": str(exc)}
+        return status, "application/json", json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+
+    return route
+
+
+async def _memory(params: dict[str, str], body: bytes) -> tuple[int, Any]:
+    return 200, memory_report(_int_param(params, "top_types", 0, 0, 200))
+
+
+async def _memory_snapshot(params: dict[str, str], body: bytes) -> tuple[int, Any]:
+    frames = _int_param(params, "frames", 1, 1, 25)
+    limit = _int_param(params, "limit", 20, 1, 200)
+    return 200, await asyncio.to_thread(tracemalloc_session.snapshot, frames, _group_by(params), limit)
+
+
+async def _memory_diff(params: dict[str, str], body: bytes) -> tuple[int, Any]:
+    limit = _int_param(params, "limit", 20, 1, 200)
+    result = await asyncio.to_thread(tracemalloc_session.diff, _group_by(params), limit)
+    if result is None:
+        return 409, {"detail": "Take a snapshot first"}
+    return 200, result
+
+
+async def _memory_stop(params: dict[str, str], body: bytes) -> tuple[int, Any]:
+    tracemalloc_session.stop()
+    return 200, {"tracemalloc": False}
+
+
+async def _profile_status(params: dict[str, str], body: bytes) -> tuple[int, Any]:
+    return 200, request_profiler.status()
+
+
+async def _arm_profile(params: dict[str, str], body: bytes) -> tuple[int, Any]:
+    payload = ProfileIn.model_validate_json(body or b"{}")
+    request_profiler.arm(profile_request(payload))
+    return 200, request_profiler.status()
+
+
+async def _disarm_profile(params: dict[str, str], body: bytes) -> tuple[int, Any]:
+    request_profiler.disarm()
+    return 200, request_profiler.status()
+
+
+def install_debug_routes() -> None:
+    register_route("GET", "/debug/profile", _admin_json(_profile_status))
+    register_route("POST", "/debug/profile", _admin_json(_arm_profile))
+    register_route("DELETE", "/debug/profile", _admin_json(_disarm_profile))
+    register_route("GET", "/debug/memory", _admin_json(_memory))
+    register_route("POST", "/debug/memory/snapshot", _admin_json(_memory_snapshot))
+    register_route("GET", "/debug/memory/diff", _admin_json(_memory_diff))
+    register_route("DELETE", "/debug/memory/snapshot", _admin_json(_memory_stop))
@@ -0,0 +1,41 @@
+import asyncio
+import logging
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Keyed by name; each client remembers the loop it was created on, because a
+# pooled connection cannot be reused from another event loop.
+_clients: dict[str, tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+
+
+def get_http_client(name: str = "default") -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    entry = _clients.get(name)
+    if entry is not None and entry[0] is loop and not entry[1].is_closed:
+        return entry[1]
+    client = httpx.AsyncClient(
+        timeout=20.0,
+        limits=httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=60.0),
+    )
+    _clients[name] = (loop, client)
+    return client
+
+
+async def preconnect(name: str, url: str) -> None:
+    # Any response will do: the point is the DNS lookup, TCP and TLS handshake,
+    # after which the connection stays in the keep-alive pool.
+    await get_http_client(name).head(url, timeout=5.0)
+
+
+async def close_http_clients() -> None:
+    entries = list(_clients.items())
+    _clients.clear()
+    for name, (loop, client) in entries:
+        if loop is not asyncio.get_running_loop() or client.is_closed:
+            continue
+        try:
+            await client.aclose()
+        except Exception:
+            logger.exception("Failed to close HTTP client %s", name)
@@ -0,0 +1,117 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import zlib
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from core.config import settings
+from core.tracing import current_correlation_id
+
+TEXT_FORMAT = "%(asctime)s | %(levelname)s | %(name)s | %(correlation_id)s | %(message)s"
+# Attributes every LogRecord has; anything else was passed via `extra=`.
+_RECORD_FIELDS = frozenset(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime"}
+
+_listener: QueueListener | None = None
+_exception_formatter = logging.Formatter()
+
+
+class CorrelationFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        # Must run in the emitting task, before the record leaves its context.
+        if not hasattr(record, "correlation_id"):
+            record.correlation_id = current_correlation_id() or "-"
+        return True
+
+
+_PLAIN_TYPES = (str, int, float, bool, type(None))
+
+
+class _SnapshotQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Interpolate here, in the emitting task: args may be ORM objects or
+        # change after the call. Only formatting of the line and I/O move to
+        # the listener thread.
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        for key, value in list(record.__dict__.items()):
+            if key not in _RECORD_FIELDS and not isinstance(value, _PLAIN_TYPES):
+                record.__dict__[key] = str(value)
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "correlation_id": getattr(record, "correlation_id", "-"),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS and key not in data:
+                data[key] = value
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exception"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def diagnostics_sampled() -> bool:
+    rate = settings.LOG_SAMPLE_RATE
+    if rate >= 1.0:
+        return True
+    if rate <= 0.0:
+        return False
+    # Keyed by correlation id, so either all lines of one message are kept or none.
+    correlation_id = current_correlation_id()
+    if correlation_id is None:
+        return random.random() < rate
+    return zlib.crc32(correlation_id.encode("utf-8")) % 10_000 < rate * 10_000
+
+
+def setup_logging() -> bool:
+    # Returns False when logging was already set up by someone else (e.g. run.py),
+    # so only the caller that installed it stops it.
+    global _listener
+    if _listener is not None:
+        return False
+
+    stream = logging.StreamHandler()
+    if settings.LOG_FORMAT == "json":
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    handler = _SnapshotQueueHandler(records)
+    handler.addFilter(CorrelationFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+
+    _listener = QueueListener(records, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return True
+
+
+def stop_logging() -> None:
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
@@ -0,0 +1,151 @@
+import gc
+import logging
+import multiprocessing
+import os
+import sys
+import tracemalloc
+from collections import Counter, deque
+from collections.abc import Callable
+from typing import Any
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+MemoryProbe = Callable[[], dict[str, Any]]
+_probes: dict[str, MemoryProbe] = {}
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def register_memory_probe(name: str, probe: MemoryProbe) -> None:
+    _probes[name] = probe
+
+
+def approx_size(obj: Any, max_objects: int = 200_000) -> int:
+    # Walks containers and slotted dataclasses; shared objects are counted once.
+    seen: set[int] = set()
+    stack = [obj]
+    total = 0
+    while stack and len(seen) < max_objects:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        nbytes = getattr(item, "nbytes", None)
+        if isinstance(nbytes, int):
+            total += nbytes
+            continue
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset, deque)):
+            stack.extend(item)
+        elif hasattr(item, "__slots__") and not isinstance(item, (str, bytes, int, float)):
+            stack.extend(getattr(item, name) for name in item.__slots__ if hasattr(item, name))
+    return total
+
+
+def _process() -> dict[str, Any]:
+    # Every process (API, poller, each bot worker) only sees its own memory.
+    return {"pid": os.getpid(), "process": multiprocessing.current_process().name}
+
+
+def _rss_bytes() -> int | None:
+    try:
+        with open("/proc/self/statm", encoding="ascii") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _max_rss_bytes() -> int | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def memory_report(top_types: int = 0) -> dict[str, Any]:
+    structures: dict[str, Any] = {}
+    for name, probe in _probes.items():
+        try:
+            structures[name] = probe()
+        except Exception:
+            logger.exception("Memory probe failed: %s", name)
+            structures[name] = {"error": True}
+
+    report: dict[str, Any] = {
+        **_process(),
+        "rss_bytes": _rss_bytes(),
+        "max_rss_bytes": _max_rss_bytes(),
+        "gc": {
+            "counts": gc.get_count(),
+            "generations": gc.get_stats(),
+            "garbage": len(gc.garbage),
+        },
+        "structures": structures,
+        "tracemalloc": tracemalloc.is_tracing(),
+    }
+    if top_types > 0:
+        counts = Counter(type(obj).__name__ for obj in gc.get_objects())
+        report["gc"]["tracked_objects"] = sum(counts.values())
+        report["top_types"] = counts.most_common(top_types)
+    return report
+
+
+def _stat_row(stat: tracemalloc.Statistic | tracemalloc.StatisticDiff) -> dict[str, Any]:
+    frame = stat.traceback[0]
+    row = {"location": f"{frame.filename}:{frame.lineno}", "size_bytes": stat.size, "count": stat.count}
+    if isinstance(stat, tracemalloc.StatisticDiff):
+        row["size_diff_bytes"] = stat.size_diff
+        row["count_diff"] = stat.count_diff
+    return row
+
+
+class TracemallocSession:
+    def __init__(self) -> None:
+        self._baseline: tracemalloc.Snapshot | None = None
+
+    def snapshot(self, frames: int, group_by: str, limit: int) -> dict[str, Any]:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self._baseline = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        current, peak = tracemalloc.get_traced_memory()
+        stats = self._baseline.statistics(group_by)[:limit]
+        return {
+            **_process(),
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "top": [_stat_row(stat) for stat in stats],
+        }
+
+    def diff(self, group_by: str, limit: int) -> dict[str, Any] | None:
+        if self._baseline is None or not tracemalloc.is_tracing():
+            return None
+        snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        stats = snapshot.compare_to(self._baseline, group_by)[:limit]
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            **_process(),
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "top": [_stat_row(stat) for stat in stats],
+        }
+
+    def stop(self) -> None:
+        self._baseline = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+tracemalloc_session = TracemallocSession()
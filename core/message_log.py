@@ -0,0 +1,131 @@
+import logging
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any
+
+from sqlalchemy import insert
+
+from core.config import settings
+from core.memory import approx_size, register_memory_probe
+from core.metering import NO_MODEL, current_turn
+from core.metrics import QUEUE_DEPTH
+from core.tracing import current_correlation_id
+from db.models import MessageEvent
+from db.session import engine, write_session
+
+logger = logging.getLogger(__name__)
+
+# Tuple layout of buffered events, also the COPY column list.
+_COLUMNS = (
+    "created_at",
+    "channel",
+    "chat_key",
+    "direction",
+    "text",
+    "correlation_id",
+    "latency_ms",
+    "model",
+    "input_tokens",
+    "output_tokens",
+    "cached_tokens",
+)
+
+
+async def _write_events(rows: list[tuple[Any, ...]]) -> None:
+    if engine.dialect.name == "postgresql":
+        async with engine.connect() as conn:
+            raw = await conn.get_raw_connection()
+            # COPY streams the whole batch in one command, without per-row statements.
+            await raw.driver_connection.copy_records_to_table(
+                MessageEvent.__tablename__,
+                records=rows,
+                columns=_COLUMNS,
+            )
+        return
+
+    async with write_session() as session:
+        await session.execute(insert(MessageEvent), [dict(zip(_COLUMNS, row)) for row in rows])
+        await session.commit()
+
+
+class MessageLog:
+    def __init__(self) -> None:
+        self._buffer: deque[tuple[Any, ...]] = deque()
+        self._last_flush = time.monotonic()
+        self._dropped = 0
+
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def memory_usage(self) -> dict[str, int]:
+        return {"events": len(self._buffer), "bytes": approx_size(self._buffer)}
+
+    def record(self, channel: str, chat_key: str, direction: str, text: str) -> None:
+        if not settings.MESSAGE_LOG_ENABLED:
+            return
+        latency_ms = model = input_tokens = output_tokens = cached_tokens = None
+        meter = current_turn()
+        if direction == "out" and meter is not None:
+            latency_ms = round((time.perf_counter() - meter.started) * 1000, 1)
+            if meter.model != NO_MODEL:
+                model = meter.model
+                input_tokens = meter.input_tokens
+                output_tokens = meter.output_tokens
+                cached_tokens = meter.cached_tokens
+
+        if len(self._buffer) >= max(settings.MESSAGE_LOG_MAX_BUFFER, 1):
+            # The database is unreachable for a while: keep the newest events.
+            self._buffer.popleft()
+            self._dropped += 1
+        self._buffer.append(
+            (
+                datetime.now(timezone.utc),
+                channel,
+                chat_key[:64],
+                direction,
+                (text or "")[: settings.MESSAGE_LOG_TEXT_LIMIT],
+                current_correlation_id(),
+                latency_ms,
+                model,
+                input_tokens,
+                output_tokens,
+                cached_tokens,
+            )
+        )
+
+    async def flush(self) -> None:
+        self._last_flush = time.monotonic()
+        if self._dropped:
+            logger.warning("Message log buffer overflowed, dropped %s events", self._dropped)
+            self._dropped = 0
+        if not self._buffer:
+            return
+
+        drained = list(self._buffer)
+        self._buffer.clear()
+        batch_size = max(settings.MESSAGE_LOG_BATCH_SIZE, 1)
+        for start in range(0, len(drained), batch_size):
+            try:
+                await _write_events(drained[start : start + batch_size])
+            except Exception:
+                remaining = drained[start:]
+                logger.exception("Failed to write message events, keeping %s in memory", len(remaining))
+                self._buffer.extendleft(reversed(remaining))
+                while len(self._buffer) > max(settings.MESSAGE_LOG_MAX_BUFFER, 1):
+                    self._buffer.popleft()
+                    self._dropped += 1
+                return
+
+    async def flush_if_due(self) -> None:
+        # Called after each reply rather than from a timer, so it also works on serverless.
+        if (
+            len(self._buffer) >= max(settings.MESSAGE_LOG_BATCH_SIZE, 1)
+            or time.monotonic() - self._last_flush >= max(settings.MESSAGE_LOG_FLUSH_SECONDS, 1)
+        ):
+            await self.flush()
+
+
+message_log = MessageLog()
+QUEUE_DEPTH.add_collector(lambda: {("message_log",): message_log.pending()})
+register_memory_probe("message_log", message_log.memory_usage)
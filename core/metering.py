@@ -0,0 +1,234 @@
+import bisect
+import json
+import logging
+import time
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.memory import approx_size, register_memory_probe
+from core.metrics import DB_SESSION_SECONDS, QUEUE_DEPTH
+from core.tracing import span
+from db.models import UsageMetric
+from db.session import session_scope, write_session
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in milliseconds; the last histogram slot counts everything slower.
+LATENCY_BUCKETS_MS: tuple[float, ...] = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 15000, 30000, 60000)
+NO_MODEL = "-"
+
+
+@dataclass(slots=True)
+class TurnMeter:
+    channel: str
+    model: str = NO_MODEL
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+    llm_ms: float = 0.0
+    db_ms: float = 0.0
+    send_ms: float = 0.0
+    started: float = field(default_factory=time.perf_counter)
+
+
+def _empty_hist() -> list[int]:
+    return [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+
+def _observe(hist: list[int], value_ms: float) -> None:
+    hist[bisect.bisect_left(LATENCY_BUCKETS_MS, value_ms)] += 1
+
+
+def hist_percentile(hist: list[int], quantile: float) -> float | None:
+    total = sum(hist)
+    if total == 0:
+        return None
+    rank = quantile * total
+    seen = 0
+    for index, count in enumerate(hist):
+        seen += count
+        if seen >= rank and count:
+            if index < len(LATENCY_BUCKETS_MS):
+                return LATENCY_BUCKETS_MS[index]
+            return float("inf")
+    return float("inf")
+
+
+@dataclass(slots=True)
+class UsageBucket:
+    turns: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+    llm_ms_total: float = 0.0
+    db_ms_total: float = 0.0
+    send_ms_total: float = 0.0
+    total_ms_total: float = 0.0
+    llm_latency_hist: list[int] = field(default_factory=_empty_hist)
+    total_latency_hist: list[int] = field(default_factory=_empty_hist)
+
+    def add(self, meter: TurnMeter, total_ms: float) -> None:
+        self.turns += 1
+        self.input_tokens += meter.input_tokens
+        self.output_tokens += meter.output_tokens
+        self.cached_tokens += meter.cached_tokens
+        self.llm_ms_total += meter.llm_ms
+        self.db_ms_total += meter.db_ms
+        self.send_ms_total += meter.send_ms
+        self.total_ms_total += total_ms
+        if meter.model != NO_MODEL:
+            _observe(self.llm_latency_hist, meter.llm_ms)
+        _observe(self.total_latency_hist, total_ms)
+
+    def merge(self, other: "UsageBucket") -> None:
+        self.turns += other.turns
+        self.input_tokens += other.input_tokens
+        self.output_tokens += other.output_tokens
+        self.cached_tokens += other.cached_tokens
+        self.llm_ms_total += other.llm_ms_total
+        self.db_ms_total += other.db_ms_total
+        self.send_ms_total += other.send_ms_total
+        self.total_ms_total += other.total_ms_total
+        for index, count in enumerate(other.llm_latency_hist[: len(self.llm_latency_hist)]):
+            self.llm_latency_hist[index] += count
+        for index, count in enumerate(other.total_latency_hist[: len(self.total_latency_hist)]):
+            self.total_latency_hist[index] += count
+
+
+BucketKey = tuple[datetime, str, str]
+
+
+class UsageAggregator:
+    def __init__(self) -> None:
+        self._buckets: dict[BucketKey, UsageBucket] = {}
+        self._last_flush = time.monotonic()
+
+    def add(self, meter: TurnMeter, total_ms: float) -> None:
+        period = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+        key = (period, meter.channel, meter.model)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = UsageBucket()
+        bucket.add(meter, total_ms)
+
+    def pending(self) -> dict[BucketKey, UsageBucket]:
+        return dict(self._buckets)
+
+    async def flush(self) -> None:
+        self._last_flush = time.monotonic()
+        if not self._buckets:
+            return
+        drained, self._buckets = self._buckets, {}
+        rows = [
+            UsageMetric(
+                period_start=period,
+                channel=channel,
+                model=model,
+                turns=bucket.turns,
+                input_tokens=bucket.input_tokens,
+                output_tokens=bucket.output_tokens,
+                cached_tokens=bucket.cached_tokens,
+                llm_ms_total=bucket.llm_ms_total,
+                db_ms_total=bucket.db_ms_total,
+                send_ms_total=bucket.send_ms_total,
+                total_ms_total=bucket.total_ms_total,
+                llm_latency_hist=json.dumps(bucket.llm_latency_hist),
+                total_latency_hist=json.dumps(bucket.total_latency_hist),
+            )
+            for (period, channel, model), bucket in drained.items()
+        ]
+        try:
+            async with write_session() as session:
+                session.add_all(rows)
+                await session.commit()
+        except Exception:
+            logger.exception("Failed to flush usage metrics, keeping %s buckets in memory", len(drained))
+            for key, bucket in drained.items():
+                current = self._buckets.setdefault(key, UsageBucket())
+                current.merge(bucket)
+
+    async def flush_if_due(self) -> None:
+        if time.monotonic() - self._last_flush >= max(settings.METERING_FLUSH_SECONDS, 1):
+            await self.flush()
+
+
+usage_aggregator = UsageAggregator()
+QUEUE_DEPTH.add_collector(lambda: {("usage_buckets",): len(usage_aggregator.pending())})
+register_memory_probe(
+    "usage_aggregator",
+    lambda: {"buckets": len(usage_aggregator.pending()), "bytes": approx_size(usage_aggregator.pending())},
+)
+_current_turn: ContextVar[TurnMeter | None] = ContextVar("current_turn", default=None)
+
+
+def current_turn() -> TurnMeter | None:
+    return _current_turn.get()
+
+
+@asynccontextmanager
+async def meter_turn(channel: str) -> AsyncIterator[TurnMeter]:
+    meter = TurnMeter(channel=channel)
+    token = _current_turn.set(meter)
+    try:
+        yield meter
+    finally:
+        _current_turn.reset(token)
+        if settings.METERING_ENABLED:
+            usage_aggregator.add(meter, (time.perf_counter() - meter.started) * 1000)
+            # Flushing here instead of from a timer also works on serverless,
+            # where nothing runs between requests.
+            await usage_aggregator.flush_if_due()
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    meter = _current_turn.get()
+    with span(stage):
+        if meter is None:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            setattr(meter, f"{stage}_ms", getattr(meter, f"{stage}_ms") + elapsed_ms)
+
+
+@asynccontextmanager
+async def metered_session(write: bool = False) -> AsyncIterator[AsyncSession]:
+    # Everything spent inside the session, including its commit, counts as DB time.
+    with timed("db"), DB_SESSION_SECONDS.time():
+        async with session_scope(write) as session:
+            yield session
+
+
+def record_llm(model: str, latency_ms: float, usage: dict[str, int] | None) -> None:
+    meter = _current_turn.get()
+    if meter is None:
+        return
+    meter.model = model
+    meter.llm_ms += latency_ms
+    if usage:
+        meter.input_tokens += usage.get("input_tokens", 0)
+        meter.output_tokens += usage.get("output_tokens", 0)
+        meter.cached_tokens += usage.get("cached_tokens", 0)
+
+
+def record_background_llm(purpose: str, model: str, latency_ms: float, usage: dict[str, int] | None) -> None:
+    # Calls that finish outside a reply turn (summaries, hedge legs that lost the
+    # race) are billed all the same; they show up in /usage under their purpose.
+    if not settings.METERING_ENABLED:
+        return
+    meter = TurnMeter(channel=purpose, model=model, llm_ms=latency_ms)
+    if usage:
+        meter.input_tokens = usage.get("input_tokens", 0)
+        meter.output_tokens = usage.get("output_tokens", 0)
+        meter.cached_tokens = usage.get("cached_tokens", 0)
+    usage_aggregator.add(meter, latency_ms)
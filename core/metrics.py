@@ -0,0 +1,290 @@
+import abc
+import asyncio
+import bisect
+import functools
+import logging
+import time
+from collections.abc import Awaitable, Callable, Iterable, Iterator
+from contextlib import contextmanager
+from http import HTTPStatus
+
+logger = logging.getLogger(__name__)
+
+LabelValues = tuple[str, ...]
+# (query string, lower-cased headers, body) -> (status, content type, body)
+RouteHandler = Callable[[str, dict[str, str], bytes], Awaitable[tuple[int, str, bytes]]]
+# Lower-cased headers -> (status, detail) when the /metrics request is refused.
+MetricsAuth = Callable[[dict[str, str]], tuple[int, str] | None]
+DEFAULT_SECONDS_BUCKETS: tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric(abc.ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        registry.register(self)
+
+    def _header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    @abc.abstractmethod
+    def render(self) -> list[str]: ...
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = self._header()
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        collect: Callable[[], dict[LabelValues, float]] | None = None,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[LabelValues, float] = {}
+        self._collectors: list[Callable[[], dict[LabelValues, float]]] = [collect] if collect else []
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+    def add_collector(self, collect: Callable[[], dict[LabelValues, float]]) -> None:
+        self._collectors.append(collect)
+
+    def render(self) -> list[str]:
+        values = dict(self._values)
+        for collect in self._collectors:
+            try:
+                values.update(collect())
+            except Exception:
+                logger.exception("Gauge collector failed for %s", self.name)
+        lines = self._header()
+        for labels, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: tuple[float, ...] = DEFAULT_SECONDS_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket..., overflow, sum]
+        self._series: dict[LabelValues, list[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def render(self) -> list[str]:
+        lines = self._header()
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0.0
+            for bound, count in zip((*self.buckets, float("inf")), series[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {_format_value(cumulative)}"
+                )
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{label_text} {_format_value(cumulative)}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: list[_Metric] = []
+
+    def register(self, metric: _Metric) -> None:
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "bitx_http_request_duration_seconds",
+    "Time spent handling API requests, including webhooks.",
+    ("path", "status"),
+)
+LLM_REQUEST_SECONDS = Histogram(
+    "bitx_llm_request_duration_seconds",
+    "Latency of LLM Responses API calls.",
+    ("model",),
+)
+LLM_ERRORS = Counter(
+    "bitx_llm_errors_total",
+    "Failed LLM calls by error class.",
+    ("error_class",),
+)
+DB_SESSION_SECONDS = Histogram(
+    "bitx_db_session_duration_seconds",
+    "Time spent inside a database session, including commit.",
+)
+LEAD_CAPTURE_OUTCOMES = Counter(
+    "bitx_lead_capture_total",
+    "Lead capture outcomes per processed message.",
+    ("outcome",),
+)
+NOTIFICATION_SEND_SECONDS = Histogram(
+    "bitx_notification_send_duration_seconds",
+    "Latency of manager notifications sent to Telegram.",
+    ("kind",),
+)
+QUEUE_DEPTH = Gauge(
+    "bitx_queue_depth",
+    "Items waiting in in-process queues and buffers.",
+    ("queue",),
+)
+DB_POOL = Gauge(
+    "bitx_db_pool_connections",
+    "Database connection pool usage (QueuePool strategies only).",
+    ("state",),
+)
+DB_CONNECTIONS_OPENED = Counter(
+    "bitx_db_connections_opened_total",
+    "New database connections opened by this process.",
+)
+TRACES_DROPPED = Counter(
+    "bitx_traces_dropped_total",
+    "Sampled traces dropped because the export queue was full.",
+)
+TOKEN_ESTIMATE_RATIO = Histogram(
+    "bitx_token_estimate_ratio",
+    "Reported input_tokens divided by the local prompt estimate.",
+    buckets=(0.5, 0.75, 0.9, 1.0, 1.1, 1.25, 1.5, 2.0, 3.0),
+)
+TOKEN_ESTIMATE_FACTOR = Gauge(
+    "bitx_token_estimate_factor",
+    "Current correction factor applied to local token estimates.",
+)
+HISTORY_STORE = Gauge(
+    "bitx_history_store",
+    "Size of the in-memory conversation history store.",
+    ("measure",),
+)
+
+
+_routes: dict[tuple[str, str], RouteHandler] = {}
+_MAX_REQUEST_BODY = 64 * 1024
+
+
+def register_route(method: str, path: str, handler: RouteHandler) -> None:
+    # Extra endpoints served next to /metrics by serve_metrics in this process.
+    _routes[(method, path)] = handler
+
+
+async def _respond(reader: asyncio.StreamReader, authorize: MetricsAuth | None) -> tuple[int, str, bytes]:
+    request_line = await reader.readline()
+    headers: dict[str, str] = {}
+    while line := (await reader.readline()).strip():
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    parts = request_line.decode("latin-1").split()
+    if len(parts) < 2:
+        return 400, "text/plain", b"bad request\n"
+    method, (path, _, query) = parts[0], parts[1].partition("?")
+    if method == "GET" and path == "/metrics":
+        error = authorize(headers) if authorize is not None else None
+        if error is not None:
+            return error[0], "text/plain", f"{error[1]}\n".encode("utf-8")
+        return 200, CONTENT_TYPE, registry.render().encode("utf-8")
+
+    handler = _routes.get((method, path))
+    if handler is None:
+        return 404, "text/plain", b"not found\n"
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        return 400, "text/plain", b"bad content-length\n"
+    if length > _MAX_REQUEST_BODY:
+        return 413, "text/plain", b"request body too large\n"
+    body = await reader.readexactly(length) if length > 0 else b""
+    return await handler(query, headers, body)
+
+
+async def _handle_metrics_connection(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    authorize: MetricsAuth | None,
+) -> None:
+    try:
+        status, content_type, body = await _respond(reader, authorize)
+        head = f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\nContent-Type: {content_type}\r\n"
+        writer.write(f"{head}Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body)
+        await writer.drain()
+    except Exception:
+        logger.exception("Failed to serve metrics request")
+    finally:
+        writer.close()
+
+
+async def serve_metrics(host: str, port: int, authorize: MetricsAuth | None = None) -> asyncio.AbstractServer:
+    server = await asyncio.start_server(functools.partial(_handle_metrics_connection, authorize=authorize), host, port)
+    logger.info("Metrics endpoint listening on http://%s:%s/metrics", host, port)
+    return server
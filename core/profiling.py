@@ -0,0 +1,182 @@
+import cProfile
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from types import FrameType
+
+from pydantic import BaseModel, Field
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MODE_CPROFILE = "cprofile"
+MODE_SAMPLE = "sample"
+
+
+@dataclass(slots=True)
+class ProfileRequest:
+    mode: str = MODE_CPROFILE
+    remaining: int = 1
+    # Compared as text so Meta sender ids work the same way as Telegram chat ids.
+    chat_id: str | None = None
+    expires_at: float | None = None
+
+
+class ProfileIn(BaseModel):
+    mode: str = MODE_CPROFILE
+    requests: int = Field(default=1, ge=1, le=100)
+    chat_id: str | None = Field(default=None, max_length=64)
+    ttl_seconds: int = Field(default=600, ge=1, le=86400)
+
+
+def profile_request(payload: ProfileIn) -> ProfileRequest:
+    if payload.mode not in {MODE_CPROFILE, MODE_SAMPLE}:
+        raise ValueError(f"mode must be {MODE_CPROFILE} or {MODE_SAMPLE}")
+    return ProfileRequest(
+        mode=payload.mode,
+        remaining=payload.requests,
+        chat_id=payload.chat_id,
+        expires_at=time.time() + payload.ttl_seconds,
+    )
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{Path(code.co_filename).name}:{code.co_name}:{code.co_firstlineno}"
+
+
+class _StackSampler:
+    # Samples the event loop thread from a side thread; the output is in the
+    # collapsed "a;b;c count" format that flamegraph.pl and speedscope read.
+    def __init__(self, thread_id: int, interval: float) -> None:
+        self._thread_id = thread_id
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self.stacks: Counter[str] = Counter()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            frame = sys._current_frames().get(self._thread_id)
+            labels: list[str] = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            if labels:
+                self.stacks[";".join(reversed(labels))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class RequestProfiler:
+    def __init__(self) -> None:
+        self._request: ProfileRequest | None = None
+        self._busy = False
+        self.written: list[str] = []
+
+    @property
+    def armed(self) -> bool:
+        return self._request is not None
+
+    def arm(self, request: ProfileRequest) -> None:
+        self._request = request
+
+    def disarm(self) -> None:
+        self._request = None
+
+    def status(self) -> dict:
+        request = self._request
+        return {
+            # Arming only affects the process that answered, see core/debug_routes.py.
+            "pid": os.getpid(),
+            "process": multiprocessing.current_process().name,
+            "armed": request is not None,
+            "mode": request.mode if request else None,
+            "remaining": request.remaining if request else 0,
+            "chat_id": request.chat_id if request else None,
+            "expires_at": request.expires_at if request else None,
+            "busy": self._busy,
+            "files": self.written[-20:],
+        }
+
+    def _claim(self, chat_id: int | str | None) -> ProfileRequest | None:
+        request = self._request
+        if request is None or self._busy:
+            return None
+        if request.expires_at is not None and time.time() > request.expires_at:
+            self._request = None
+            return None
+        if request.chat_id is not None and request.chat_id != str(chat_id):
+            return None
+        request.remaining -= 1
+        if request.remaining <= 0:
+            self._request = None
+        return request
+
+    def _output_path(self, label: str, suffix: str) -> Path:
+        directory = Path(settings.PROFILE_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        return directory / f"{stamp}-{int(time.time_ns() % 1_000_000_000)}-{label}{suffix}"
+
+    def _saved(self, label: str, chat_id: int | str | None, path: Path) -> None:
+        self.written.append(str(path))
+        logger.info("Request profile written: label=%s chat_id=%s path=%s", label, chat_id, path)
+
+    @asynccontextmanager
+    async def profile(self, label: str, chat_id: int | str | None = None) -> AsyncIterator[None]:
+        # Fast path: a single attribute check while nothing is armed.
+        if self._request is None:
+            yield
+            return
+        request = self._claim(chat_id)
+        if request is None:
+            yield
+            return
+
+        # Other tasks running on the loop during this request end up in the
+        # profile too; with one request in flight that is rarely an issue.
+        self._busy = True
+        try:
+            if request.mode == MODE_SAMPLE:
+                sampler = _StackSampler(threading.get_ident(), max(settings.PROFILE_SAMPLE_INTERVAL_MS, 1) / 1000)
+                sampler.start()
+                try:
+                    yield
+                finally:
+                    sampler.stop()
+                    path = self._output_path(label, ".collapsed")
+                    path.write_text(sampler.collapsed(), encoding="utf-8")
+                    self._saved(label, chat_id, path)
+            else:
+                profiler = cProfile.Profile()
+                profiler.enable()
+                try:
+                    yield
+                finally:
+                    profiler.disable()
+                    path = self._output_path(label, ".pstats")
+                    profiler.dump_stats(str(path))
+                    self._saved(label, chat_id, path)
+        finally:
+            self._busy = False
+
+
+request_profiler = RequestProfiler()
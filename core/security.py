@@ -1,10 +1,14 @@
+import hmac
 from collections.abc import Mapping
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-from aiogram.types import Message
+from fastapi import Header, HTTPException
 
 from core.config import settings
 
+if TYPE_CHECKING:
+    from aiogram.types import Message
+
 
 def is_admin_identity(chat_id: int | None, user_id: int | None) -> bool:
     admin_id = settings.ADMIN_CHAT_ID
@@ -13,7 +17,7 @@ def is_admin_identity(chat_id: int | None, user_id: int | None) -> bool:
     return chat_id == admin_id or user_id == admin_id
 
 
-def is_admin_message(message: Message) -> bool:
+def is_admin_message(message: "Message") -> bool:
     chat_id = getattr(getattr(message, "chat", None), "id", None)
     user_id = getattr(getattr(message, "from_user", None), "id", None)
     return is_admin_identity(chat_id=chat_id, user_id=user_id)
@@ -35,3 +39,36 @@ def is_admin_payload(payload: Mapping[str, Any]) -> bool:
         user_id = None
 
     return is_admin_identity(chat_id=chat_id, user_id=user_id)
+
+
+def admin_token_error(admin_token: str | None) -> tuple[int, str] | None:
+    expected = (settings.ADMIN_API_TOKEN or "").strip()
+    if not expected:
+        return 503, "ADMIN_API_TOKEN is not configured"
+    if not hmac.compare_digest((admin_token or "").strip(), expected):
+        return 403, "Invalid admin token"
+    return None
+
+
+def metrics_access_error(headers: Mapping[str, str]) -> tuple[int, str] | None:
+    # Expects lower-case header names (Starlette headers or serve_metrics).
+    if settings.METRICS_PUBLIC:
+        return None
+    expected = (settings.METRICS_TOKEN or "").strip()
+    authorization = (headers.get("authorization") or "").strip()
+    if expected and hmac.compare_digest(authorization.encode(), f"Bearer {expected}".encode()):
+        return None
+    admin_token = headers.get("x-admin-token")
+    if admin_token and admin_token_error(admin_token) is None:
+        return None
+    if not expected and not (settings.ADMIN_API_TOKEN or "").strip():
+        return 503, "METRICS_TOKEN is not configured"
+    return 403, "Invalid metrics token"
+
+
+def require_admin_token(
+    admin_token: str | None = Header(default=None, alias="X-Admin-Token"),
+) -> None:
+    error = admin_token_error(admin_token)
+    if error is not None:
+        raise HTTPException(status_code=error[0], detail=error[1])
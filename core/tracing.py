@@ -0,0 +1,249 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from core.config import settings
+from core.http import get_http_client
+from core.metrics import QUEUE_DEPTH, TRACES_DROPPED
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: int = 0
+    status: str = "ok"
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class Trace:
+    trace_id: str
+    correlation_id: str
+    spans: list[Span] = field(default_factory=list)
+    finished: bool = False
+
+
+_current_trace: ContextVar[Trace | None] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+_correlation_id: ContextVar[str | None] = ContextVar("correlation_id", default=None)
+
+
+def current_correlation_id() -> str | None:
+    return _correlation_id.get()
+
+
+def annotate(**attributes: Any) -> None:
+    current = _current_span.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span | None]:
+    trace = _current_trace.get()
+    if trace is None or trace.finished:
+        # Unsampled or no trace at all: no allocations on the hot path.
+        yield None
+        return
+
+    parent = _current_span.get()
+    current = Span(
+        name=name,
+        trace_id=trace.trace_id,
+        span_id=os.urandom(8).hex(),
+        parent_id=parent.span_id if parent is not None else None,
+        attributes=attributes,
+    )
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.status = "error"
+        current.attributes["error.type"] = type(exc).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end_ns = time.time_ns()
+        trace.spans.append(current)
+
+
+@asynccontextmanager
+async def trace_turn(name: str, correlation_id: str, **attributes: Any) -> AsyncIterator[None]:
+    if _current_trace.get() is not None:
+        # Already inside a traced turn (e.g. webhook -> dispatcher): just nest.
+        with span(name, **attributes):
+            yield
+        return
+
+    correlation_token = _correlation_id.set(correlation_id)
+    sampled = settings.TRACING_ENABLED and random.random() < settings.TRACING_SAMPLE_RATE
+    if not sampled:
+        try:
+            yield
+        finally:
+            _correlation_id.reset(correlation_token)
+        return
+
+    trace = Trace(trace_id=os.urandom(16).hex(), correlation_id=correlation_id)
+    trace_token = _current_trace.set(trace)
+    try:
+        with span(name, correlation_id=correlation_id, **attributes):
+            yield
+    finally:
+        trace.finished = True
+        _current_trace.reset(trace_token)
+        _correlation_id.reset(correlation_token)
+        trace_exporter.submit(trace)
+
+
+def _jsonl_record(trace: Trace) -> str:
+    return json.dumps(
+        {
+            "trace_id": trace.trace_id,
+            "correlation_id": trace.correlation_id,
+            "spans": [
+                {
+                    "name": item.name,
+                    "span_id": item.span_id,
+                    "parent_id": item.parent_id,
+                    "start_ns": item.start_ns,
+                    "duration_ms": round((item.end_ns - item.start_ns) / 1e6, 3),
+                    "status": item.status,
+                    "attributes": item.attributes,
+                }
+                for item in trace.spans
+            ],
+        },
+        ensure_ascii=False,
+        default=str,
+    )
+
+
+def _append_lines(path: Path, lines: list[str]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a", encoding="utf-8") as handle:
+        handle.writelines(line + "\n" for line in lines)
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(trace: Trace, item: Span) -> dict[str, Any]:
+    attributes = {"correlation_id": trace.correlation_id, **item.attributes}
+    otlp_span: dict[str, Any] = {
+        "traceId": item.trace_id,
+        "spanId": item.span_id,
+        "name": item.name,
+        "kind": 1,
+        "startTimeUnixNano": str(item.start_ns),
+        "endTimeUnixNano": str(item.end_ns),
+        "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()],
+        "status": {"code": 2 if item.status == "error" else 1},
+    }
+    if item.parent_id:
+        otlp_span["parentSpanId"] = item.parent_id
+    return otlp_span
+
+
+def _otlp_payload(traces: list[Trace]) -> dict[str, Any]:
+    spans = [_otlp_span(trace, item) for trace in traces for item in trace.spans]
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": settings.TRACING_SERVICE_NAME}},
+                    ]
+                },
+                "scopeSpans": [{"scope": {"name": "bitx"}, "spans": spans}],
+            }
+        ]
+    }
+
+
+async def _export_batch(traces: list[Trace]) -> None:
+    try:
+        if settings.TRACING_OTLP_ENDPOINT:
+            endpoint = f"{settings.TRACING_OTLP_ENDPOINT.rstrip('/')}/v1/traces"
+            response = await get_http_client().post(endpoint, json=_otlp_payload(traces), timeout=2.0)
+            response.raise_for_status()
+        else:
+            lines = [_jsonl_record(trace) for trace in traces]
+            await asyncio.to_thread(_append_lines, Path(settings.TRACING_FILE), lines)
+    except Exception:
+        logger.exception("Failed to export %s traces, first correlation_id=%s", len(traces), traces[0].correlation_id)
+
+
+class TraceExporter:
+    # Finished traces are exported by a background task, so a turn never waits
+    # on the collector or the disk. When export falls behind, new traces are dropped.
+    def __init__(self) -> None:
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._buffer: deque[Trace] = deque()
+        self._worker: asyncio.Task | None = None
+        self._dropped = 0
+
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def submit(self, trace: Trace) -> None:
+        if not trace.spans:
+            return
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._buffer.clear()
+            self._worker = None
+        if len(self._buffer) >= max(settings.TRACING_QUEUE_SIZE, 1):
+            self._dropped += 1
+            TRACES_DROPPED.inc()
+            return
+        self._buffer.append(trace)
+        if self._worker is None:
+            self._worker = loop.create_task(self._drain())
+
+    async def _drain(self) -> None:
+        try:
+            batch_size = max(settings.TRACING_EXPORT_BATCH, 1)
+            while self._buffer:
+                batch = [self._buffer.popleft() for _ in range(min(batch_size, len(self._buffer)))]
+                await _export_batch(batch)
+                if self._dropped:
+                    logger.warning("Trace export queue overflowed, dropped %s traces", self._dropped)
+                    self._dropped = 0
+        finally:
+            self._worker = None
+
+    async def flush(self) -> None:
+        worker = self._worker
+        if worker is not None and self._loop is asyncio.get_running_loop():
+            await asyncio.wait({worker})
+        elif self._buffer:
+            await self._drain()
+
+
+trace_exporter = TraceExporter()
+QUEUE_DEPTH.add_collector(lambda: {("trace_export",): trace_exporter.pending()})
@@ -1,7 +1,58 @@
-from db.models import Base
+import hashlib
+import logging
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from core.config import settings
+from db.models import Base, SchemaMarker
 from db.session import engine
 
+logger = logging.getLogger(__name__)
+
+SCHEMA_MARKER_KEY = "schema_version"
+
+
+def schema_fingerprint() -> str:
+    # Derived from the models, so any new table, column or index changes it
+    # without a manually bumped version number.
+    parts: list[str] = []
+    for table in sorted(Base.metadata.tables.values(), key=lambda item: item.name):
+        columns = ",".join(f"{column.name}:{column.type}" for column in table.columns)
+        indexes = ",".join(sorted(index.name or "" for index in table.indexes))
+        parts.append(f"{table.name}({columns})[{indexes}]")
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:32]
+
+
+def _create_missing_indexes(sync_conn) -> None:
+    # create_all only adds indexes together with new tables.
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
+
+
+async def _stored_fingerprint() -> str | None:
+    try:
+        async with engine.connect() as conn:
+            result = await conn.execute(select(SchemaMarker.value).where(SchemaMarker.key == SCHEMA_MARKER_KEY))
+            return result.scalar_one_or_none()
+    except SQLAlchemyError:
+        # Fresh database: the marker table itself does not exist yet.
+        return None
+
+
+async def ensure_db_schema(force: bool = False) -> None:
+    if settings.DB_SCHEMA_SYNC == "off" and not force:
+        return
+
+    fingerprint = schema_fingerprint()
+    if settings.DB_SCHEMA_SYNC != "always" and not force:
+        if await _stored_fingerprint() == fingerprint:
+            return
 
-async def ensure_db_schema() -> None:
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_create_missing_indexes)
+        await conn.execute(delete(SchemaMarker).where(SchemaMarker.key == SCHEMA_MARKER_KEY))
+        await conn.execute(SchemaMarker.__table__.insert().values(key=SCHEMA_MARKER_KEY, value=fingerprint))
+    logger.info("Database schema synced: version=%s", fingerprint)
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import BigInteger, Boolean, DateTime, String, Text, func
+from sqlalchemy import BigInteger, Boolean, DateTime, Float, Index, Integer, String, Text, func
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 
@@ -10,6 +10,12 @@ class Base(DeclarativeBase):
 
 class Lead(Base):
     __tablename__ = "leads"
+    # Keyset pagination walks (created_at, id); the filtered variants lead with the filter column.
+    __table_args__ = (
+        Index("ix_leads_created_id", "created_at", "id"),
+        Index("ix_leads_status_created_id", "status", "created_at", "id"),
+        Index("ix_leads_source_created_id", "source", "created_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
 
@@ -43,6 +49,19 @@ class AssistantConfig(Base):
     )
 
 
+class FaqEntry(Base):
+    __tablename__ = "faq_entries"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    question: Mapped[str] = mapped_column(Text)
+    answer: Mapped[str] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+    )
+
+
 class LeadProfile(Base):
     __tablename__ = "lead_profiles"
 
@@ -73,3 +92,61 @@ class LeadProfile(Base):
         onupdate=func.now(),
         nullable=False,
     )
+
+
+class UsageMetric(Base):
+    __tablename__ = "usage_metrics"
+    __table_args__ = (Index("ix_usage_metrics_period_channel", "period_start", "channel"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    period_start: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    channel: Mapped[str] = mapped_column(String(30))
+    model: Mapped[str] = mapped_column(String(64))
+
+    turns: Mapped[int] = mapped_column(default=0)
+    input_tokens: Mapped[int] = mapped_column(BigInteger, default=0)
+    output_tokens: Mapped[int] = mapped_column(BigInteger, default=0)
+    cached_tokens: Mapped[int] = mapped_column(BigInteger, default=0)
+    llm_ms_total: Mapped[float] = mapped_column(Float, default=0.0)
+    db_ms_total: Mapped[float] = mapped_column(Float, default=0.0)
+    send_ms_total: Mapped[float] = mapped_column(Float, default=0.0)
+    total_ms_total: Mapped[float] = mapped_column(Float, default=0.0)
+    # JSON arrays of counts per core.metering.LATENCY_BUCKETS_MS bucket (+ overflow).
+    llm_latency_hist: Mapped[str] = mapped_column(Text, default="[]")
+    total_latency_hist: Mapped[str] = mapped_column(Text, default="[]")
+
+
+class MessageEvent(Base):
+    __tablename__ = "message_events"
+    # Append-only and written in time order, so BRIN on Postgres keeps range scans cheap at a fraction of a B-tree.
+    __table_args__ = (
+        Index("ix_message_events_created_at", "created_at", postgresql_using="brin"),
+        Index("ix_message_events_chat_created", "chat_key", "created_at"),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    channel: Mapped[str] = mapped_column(String(30))
+    chat_key: Mapped[str] = mapped_column(String(64))
+    # in | out
+    direction: Mapped[str] = mapped_column(String(3))
+    text: Mapped[str] = mapped_column(Text)
+    correlation_id: Mapped[str | None] = mapped_column(String(128), nullable=True)
+    latency_ms: Mapped[float | None] = mapped_column(Float, nullable=True)
+    model: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    input_tokens: Mapped[int | None] = mapped_column(nullable=True)
+    output_tokens: Mapped[int | None] = mapped_column(nullable=True)
+    cached_tokens: Mapped[int | None] = mapped_column(nullable=True)
+
+
+class SchemaMarker(Base):
+    __tablename__ = "schema_meta"
+
+    key: Mapped[str] = mapped_column(String(50), primary_key=True)
+    value: Mapped[str] = mapped_column(String(128))
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+    )
@@ -1,7 +1,19 @@
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+import asyncio
+import os
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager, nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any
 from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+from uuid import uuid4
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool, QueuePool
 
 from core.config import settings
+from core.metrics import DB_CONNECTIONS_OPENED, DB_POOL
 
 
 def _normalize_database_url(raw_url: str) -> str:
@@ -31,16 +43,192 @@ def _normalize_asyncpg_query(url: str) -> str:
 
 
 database_url = _normalize_asyncpg_query(_normalize_database_url(settings.DATABASE_URL))
+is_sqlite = database_url.startswith("sqlite")
+
+
+def _pool_strategy(url: str) -> str:
+    strategy = (settings.DB_POOL_STRATEGY or "auto").lower()
+    if strategy != "auto":
+        return strategy
+    if url.startswith("sqlite"):
+        return "queue"
+    # Every serverless instance would otherwise keep its own idle pool.
+    return "null" if os.getenv("VERCEL") else "queue"
+
+
+def _engine_kwargs(url: str) -> dict[str, Any]:
+    kwargs: dict[str, Any] = {"echo": False}
+    connect_args: dict[str, Any] = {}
+    if url.startswith("sqlite+aiosqlite://"):
+        # Fail faster when SQLite file is locked instead of hanging.
+        connect_args["timeout"] = max(settings.SQLITE_BUSY_TIMEOUT_MS, 0) / 1000 if settings.SQLITE_WAL else 10
+
+    strategy = _pool_strategy(url)
+    if strategy in {"null", "pgbouncer"}:
+        kwargs["poolclass"] = NullPool
+    elif ":memory:" not in url:
+        kwargs["pool_size"] = max(settings.DB_POOL_SIZE, 1)
+        kwargs["max_overflow"] = max(settings.DB_MAX_OVERFLOW, 0)
+        kwargs["pool_timeout"] = settings.DB_POOL_TIMEOUT
+        kwargs["pool_recycle"] = settings.DB_POOL_RECYCLE
+        kwargs["pool_pre_ping"] = settings.DB_POOL_PRE_PING
+
+    if strategy == "pgbouncer" and url.startswith("postgresql+asyncpg://"):
+        # PgBouncer in transaction mode cannot keep named prepared statements
+        # bound to one server connection.
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_cache_size"] = 0
+        connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+    elif url.startswith("postgresql+asyncpg://"):
+        # PgBouncer rejects unknown startup parameters, so only direct connections get these.
+        connect_args["server_settings"] = {"application_name": "bitx-bot", "jit": "on" if settings.DB_JIT else "off"}
+
+    if connect_args:
+        kwargs["connect_args"] = connect_args
+    return kwargs
 
-engine_kwargs = {"echo": False}
-if database_url.startswith("sqlite+aiosqlite://"):
-    # Fail faster when SQLite file is locked instead of hanging.
-    engine_kwargs["connect_args"] = {"timeout": 10}
 
-engine = create_async_engine(database_url, **engine_kwargs)
+pool_strategy = _pool_strategy(database_url)
+engine = create_async_engine(database_url, **_engine_kwargs(database_url))
+
+
+@event.listens_for(engine.sync_engine, "connect")
+def _count_connect(dbapi_connection: Any, connection_record: Any) -> None:
+    DB_CONNECTIONS_OPENED.inc()
+
+
+if is_sqlite and settings.SQLITE_WAL and ":memory:" not in database_url:
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _sqlite_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+        # WAL lets readers run next to the single writer; NORMAL fsyncs only at checkpoints.
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={max(settings.SQLITE_BUSY_TIMEOUT_MS, 0)}")
+        cursor.execute(f"PRAGMA mmap_size={max(settings.SQLITE_MMAP_SIZE, 0)}")
+        # Negative cache_size is in KiB rather than pages.
+        cursor.execute(f"PRAGMA cache_size=-{max(settings.SQLITE_CACHE_SIZE_KB, 0)}")
+        cursor.close()
+
+
+def _pool_usage() -> dict[tuple[str, ...], float]:
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {}
+    return {
+        ("size",): pool.size(),
+        ("checked_out",): pool.checkedout(),
+        ("checked_in",): pool.checkedin(),
+        ("overflow",): max(pool.overflow(), 0),
+    }
+
+
+DB_POOL.add_collector(_pool_usage)
 
 async_session = async_sessionmaker(
     bind=engine,
     class_=AsyncSession,
     expire_on_commit=False,
 )
+
+
+_write_lock: asyncio.Lock | None = None
+
+
+def _writer_lock() -> asyncio.Lock | None:
+    if not is_sqlite or not settings.SQLITE_WAL:
+        return None
+    global _write_lock
+    if _write_lock is None:
+        _write_lock = asyncio.Lock()
+    return _write_lock
+
+
+@asynccontextmanager
+async def write_session() -> AsyncIterator[AsyncSession]:
+    lock = _writer_lock()
+    if lock is None:
+        async with async_session() as session:
+            yield session
+        return
+
+    # SQLite allows one writer at a time. Queueing writers here and taking the
+    # write lock up front (BEGIN IMMEDIATE) avoids deferred transactions that
+    # fail with "database is locked" when they try to upgrade to a write.
+    async with lock:
+        async with async_session() as session:
+            await session.execute(text("BEGIN IMMEDIATE"))
+            yield session
+
+
+@dataclass(slots=True)
+class _UnitOfWork:
+    task: asyncio.Task | None
+    session: AsyncSession | None = None
+
+
+_unit_of_work: ContextVar[_UnitOfWork | None] = ContextVar("unit_of_work", default=None)
+
+
+def _active_unit() -> _UnitOfWork | None:
+    unit = _unit_of_work.get()
+    # Tasks spawned while handling the update inherit the context, but an
+    # AsyncSession must not be used from two tasks at once.
+    if unit is None or unit.task is not asyncio.current_task():
+        return None
+    return unit
+
+
+@asynccontextmanager
+async def unit_of_work() -> AsyncIterator[None]:
+    if _active_unit() is not None:
+        yield
+        return
+
+    unit = _UnitOfWork(task=asyncio.current_task())
+    token = _unit_of_work.set(unit)
+    try:
+        yield
+    finally:
+        _unit_of_work.reset(token)
+        if unit.session is not None:
+            await unit.session.close()
+
+
+@asynccontextmanager
+async def session_scope(write: bool = False) -> AsyncIterator[AsyncSession]:
+    unit = _active_unit()
+    if unit is None:
+        async with (write_session() if write else async_session()) as session:
+            yield session
+        return
+
+    if unit.session is None:
+        unit.session = async_session()
+    session = unit.session
+    try:
+        if not write:
+            yield session
+            return
+        lock = _writer_lock()
+        async with lock if lock is not None else nullcontext():
+            if lock is not None:
+                await session.execute(text("BEGIN IMMEDIATE"))
+            yield session
+            # Write stages commit their own work; anything left over is
+            # discarded here, as closing a standalone session would.
+            if session.in_transaction():
+                await session.close()
+    except BaseException:
+        # close() detaches what earlier stages loaded, rollback() would expire it.
+        await session.close()
+        raise
+
+
+async def release_connection() -> None:
+    # Called before long waits (the LLM request) so the pooled connection is
+    # not held idle; the next stage checks one out again.
+    unit = _active_unit()
+    if unit is not None and unit.session is not None:
+        await unit.session.close()
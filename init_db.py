@@ -4,7 +4,7 @@ from db.init import ensure_db_schema
 from db.session import engine
 
 async def init():
-    await ensure_db_schema()
+    await ensure_db_schema(force=True)
     await engine.dispose()
 
 asyncio.run(init()) 
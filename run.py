@@ -4,8 +4,9 @@ import os
 import uvicorn
 
 from api.main import app
-from bot.main import run_polling, setup_logging
+from bot.main import run_polling
 from core.config import settings
+from core.logs import setup_logging
 
 
 async def run_api_server(host: str, port: int) -> None: